@@ -1,7 +1,7 @@
 import streamlit as st
 
 from core import file_handler 
-from core.helper import extract_from_text, extract_content_from_screenshots, get_screenshot_from_urls
+from core.helper import extract_from_text, extract_content_from_screenshots, extract_content_from_urls
 from core import constants
 # from core import output_processor
 from core import llm_helper
@@ -37,15 +37,8 @@ elif input_method == screenshot_option:
         text_input = ' '.join(str(c) for c in content_df['content'] if c)
         extract_from_text(llm=llm, text_input=text_input)
 elif input_method == url_option:
-    get_screenshot_from_urls()
-    screenshot_result = st.session_state.get("screenshot_result", None)
-
-    if screenshot_result and "image_paths" in screenshot_result:
-        screenshots = screenshot_result["image_paths"]
-
-        content_df = extract_content_from_screenshots(llm=llm, screenshot_files=screenshots)
-        if content_df is not None:
-            text_input = ' '.join(str(c) for c in content_df['content'] if c)
-            extract_from_text(llm=llm, text_input=text_input)
-
+    content_df = extract_content_from_urls(llm=llm)
+    if content_df is not None:
+        text_input = ' '.join(str(c) for c in content_df['content'] if c)
+        extract_from_text(llm=llm, text_input=text_input)
 
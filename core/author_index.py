@@ -0,0 +1,120 @@
+import os
+import zlib
+import threading
+import numpy as np
+import pandas as pd
+
+N_FEATURES = 2 ** 12
+NGRAM_RANGE = (2, 4)
+
+
+def get_or_create_index_folder():
+    base_folder = os.path.join(os.getcwd(), ".streamlit_cache", "author_index")
+    os.makedirs(base_folder, exist_ok=True)
+    return base_folder
+
+def ngram_counts(text: str) -> np.ndarray:
+    """
+    Hashes the character n-grams of `text` into a fixed-size count vector.
+    Case, punctuation and spacing are kept on purpose: they carry most of an author's style.
+    """
+    counts = np.zeros(N_FEATURES, dtype=np.float32)
+    if not text:
+        return counts
+
+    data = text.encode("utf-8")
+    buckets = [
+        zlib.crc32(data[i:i + n]) % N_FEATURES
+        for n in range(NGRAM_RANGE[0], NGRAM_RANGE[1] + 1)
+        for i in range(len(data) - n + 1)
+    ]
+    if buckets:
+        counts += np.bincount(buckets, minlength=N_FEATURES).astype(np.float32)
+    return counts
+
+def content_counts(content_df: pd.DataFrame) -> np.ndarray:
+    return ngram_counts("\n".join(str(c) for c in content_df["content"] if c))
+
+def _normalize(counts: np.ndarray) -> np.ndarray:
+    # Sublinear tf so a few very frequent n-grams don't dominate, then L2 for cosine similarity
+    vectors = np.log1p(counts)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1
+    return vectors / norms
+
+
+class AuthorIndex:
+
+    """
+    Local flat index of author style vectors, persisted under `.streamlit_cache/author_index`.
+    Each entry holds the n-gram counts of the content last archived under its key, so re-archiving an
+    author's grown corpus replaces the entry rather than counting earlier content twice.
+    Search is a single matrix-vector product. The index is shared by all sessions, so access is locked.
+    """
+
+    def __init__(self, folder: str = None):
+        self.path = os.path.join(folder or get_or_create_index_folder(), "index.npz")
+        self.keys = []
+        self.counts = np.zeros((0, N_FEATURES), dtype=np.float32)
+
+        if os.path.exists(self.path):
+            with np.load(self.path, allow_pickle=False) as data:
+                self.keys = [str(k) for k in data["keys"]]
+                self.counts = data["counts"]
+
+        self._vectors = None
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, key: str, counts: np.ndarray):
+        """Stores `counts` (from `content_counts`) under `key`, replacing any earlier entry."""
+        with self.lock:
+            if key in self.keys:
+                self.counts[self.keys.index(key)] = counts
+            else:
+                self.keys.append(key)
+                self.counts = np.vstack([self.counts, counts[None, :]])
+            self._vectors = None
+
+    def add_from_corpora(self, corpora_folder: str):
+        """Adds every author of every stored investigation corpus, keyed as '<investigation>/<author>'."""
+        for name in sorted(os.listdir(corpora_folder)):
+            content_path = os.path.join(corpora_folder, name, "content.csv")
+            if not os.path.exists(content_path):
+                continue
+            df = pd.read_csv(content_path, encoding="utf-8-sig", dtype=str, keep_default_na=False)
+            for author, author_df in df.groupby("author"):
+                self.add(f"{name}/{author}", content_counts(author_df))
+
+    def search(self, counts: np.ndarray, k: int = 5, exclude: str = None) -> pd.DataFrame:
+        """Returns the top-k past authors most stylistically similar to `counts`, with their cosine similarity."""
+        with self.lock:
+            if not self.keys:
+                return pd.DataFrame({"author": [], "similarity": []})
+
+            if self._vectors is None:
+                self._vectors = _normalize(self.counts)
+
+            scores = self._vectors @ _normalize(counts)
+            keys = list(self.keys)
+
+        if exclude in keys:
+            scores[keys.index(exclude)] = -np.inf
+
+        k = min(k, len(keys))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        top = [i for i in top if np.isfinite(scores[i])]
+
+        return pd.DataFrame({
+            "author": [keys[i] for i in top],
+            "similarity": [round(float(scores[i]), 4) for i in top],
+        })
+
+    def save(self):
+        with self.lock:
+            tmp_path = self.path + ".tmp.npz"
+            np.savez(tmp_path, keys=np.array(self.keys, dtype=str), counts=self.counts)
+            os.replace(tmp_path, self.path)
@@ -0,0 +1,78 @@
+import itertools
+import numpy as np
+
+from PIL import Image
+
+
+# LLM calls a chunk with the author on it needs: presence check and extraction
+CALLS_PER_CHUNK = 2
+
+
+class ExtractionBudget:
+
+    """
+    Stop condition for triage runs: extraction ends once the author's content reaches `max_words`
+    or the run could not process another chunk within `max_calls` LLM calls, whichever comes first.
+    None means no limit. `max_calls` is a hard cap: the `LLMInterface` of the run refuses calls beyond it,
+    so a chunk whose escalation or retry would exceed it fails (and is retried by a later run) instead.
+    """
+
+    def __init__(self, max_words: int = None, max_calls: int = None):
+        self.max_words = max_words or None
+        self.max_calls = max_calls or None
+
+    def __repr__(self):
+        return f"ExtractionBudget(max_words={self.max_words}, max_calls={self.max_calls})"
+
+    def met(self, words: int, calls: int) -> bool:
+        """True once no further chunk should be dispatched."""
+        return (
+            (self.max_words is not None and words >= self.max_words)
+            or (self.max_calls is not None and calls + CALLS_PER_CHUNK > self.max_calls)
+        )
+
+def count_words(content_list: list) -> int:
+    return sum(
+        len(str(text).split())
+        for result in content_list if isinstance(result, dict)
+        for text in result.get("content", [])
+    )
+
+
+def text_density(img: Image.Image, width: int = 256) -> float:
+    """
+    Cheap local estimate of how much text an image holds: the share of pixels on a sharp edge
+    in a small grayscale thumbnail. Text-heavy screenshots score high, photos and blank space low.
+    """
+    img = img.convert("L")
+    if img.width > width:
+        img = img.resize((width, max(1, round(img.height * width / img.width))))
+
+    pixels = np.asarray(img, dtype=np.int16)
+    if pixels.shape[0] < 2 or pixels.shape[1] < 2:
+        return 0.0
+    edges = (np.abs(np.diff(pixels, axis=1))[:-1, :] + np.abs(np.diff(pixels, axis=0))[:, :-1]) > 60
+    return float(edges.mean())
+
+def order_by_yield(chunks_dict: dict) -> list:
+    """
+    Flattens `chunks_dict` into (filename, chunk) pairs, densest text first.
+    The crops of one source stay together (sources ranked by their densest crop, then crops by density),
+    so each source is decoded once here and once more when it is encoded. PDF pages are rendered at low resolution.
+    """
+    groups = []
+    for filename, chunks in chunks_dict.items():
+        for _, source_chunks in itertools.groupby(chunks, key=lambda c: (c.path, c.page)):
+            source_chunks = list(source_chunks)
+            try:
+                # PDF page chunks are whole pages, so rendering them small doesn't affect any crop box
+                with source_chunks[0].open_source(dpi=30) as img:
+                    scored = [(text_density(img.crop(chunk.box) if chunk.box else img), chunk) for chunk in source_chunks]
+            except Exception as e:
+                print(f"Could not score {source_chunks[0]}: {e}")
+                scored = [(0.0, chunk) for chunk in source_chunks]
+            scored.sort(key=lambda item: item[0], reverse=True)
+            groups.append((scored[0][0], filename, [chunk for _, chunk in scored]))
+
+    groups.sort(key=lambda item: item[0], reverse=True)
+    return [(filename, chunk) for _, filename, chunks in groups for chunk in chunks]
@@ -1,8 +1,56 @@
-import streamlit as st
+import os
 
-AZUREOPENAI_ENDPOINT = st.secrets["AZUREOPENAI_ENDPOINT"]
-AZUREOPENAI_API_KEY = st.secrets["AZUREOPENAI_API_KEY"]
-AZUREOPENAI_API_VERION = "2024-02-01"
+try:
+    import streamlit as st
+except ImportError:
+    # Offline tools (python -m core.evaluation) run without Streamlit
+    st = None
+
+def _secret(name: str, default=None):
+    """
+    Reads `name` from the Streamlit secrets, falling back to an environment variable of the same name
+    (comma-separated for lists), so modules can be imported without the app's secrets.toml.
+    """
+    if st is not None:
+        try:
+            return st.secrets[name]
+        except (KeyError, FileNotFoundError):
+            pass
+
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    if isinstance(default, list):
+        return [v.strip() for v in value.split(",") if v.strip()]
+    if isinstance(default, int):
+        return int(value)
+    return value
+
+AZUREOPENAI_ENDPOINT = _secret("AZUREOPENAI_ENDPOINT")
+AZUREOPENAI_API_KEY = _secret("AZUREOPENAI_API_KEY")
+AZUREOPENAI_API_VERION = "2024-10-21"  # json_schema response_format needs 2024-08-01-preview or later
 AZUREOPENAI_MODEL = "gpt-4.1"
+# Small deployment (e.g. "gpt-4.1-mini"); only used when configured, as existing installs may not have one
+AZUREOPENAI_MODEL_MINI = _secret("AZUREOPENAI_MODEL_MINI")
+
+# Cheap tasks (presence check, keyword extraction) go to the small deployment and escalate to the full one
+# on malformed or low-confidence answers. Without a small deployment both routes use the full model.
+# Prices are USD per 1M tokens: (input, cached input, output).
+MODEL_ROUTES = {
+    "full": {"model": AZUREOPENAI_MODEL, "price": (2.00, 0.50, 8.00)},
+}
+MODEL_ROUTES["cheap"] = (
+    {"model": AZUREOPENAI_MODEL_MINI, "price": (0.40, 0.10, 1.60)} if AZUREOPENAI_MODEL_MINI else MODEL_ROUTES["full"]
+)
+MIN_ROUTE_CONFIDENCE = 0.9
+
+SCREENSHOTMACHINE_API_KEY_LIST = _secret("SCREENSHOTMACHINE_API_KEY_LIST", [])
+# Captures are reused across sessions for this long, and the store is kept under this size
+SCREENSHOT_TTL_SECONDS = _secret("SCREENSHOT_TTL_SECONDS", 7 * 24 * 3600)
+SCREENSHOT_CACHE_MAX_BYTES = _secret("SCREENSHOT_CACHE_MAX_BYTES", 2 * 1024 ** 3)
+SERPER_API_KEY_LIST = _secret("SERPER_API_KEY_LIST", [])
 
-SCREENSHOTMACHINE_API_KEY_LIST = st.secrets["SCREENSHOTMACHINE_API_KEY_LIST"]
\ No newline at end of file
+# Background jobs: worker threads, and process-wide caps on concurrent API calls across all users
+JOB_WORKERS = _secret("JOB_WORKERS", 4)
+MAX_CONCURRENT_LLM_CALLS = _secret("MAX_CONCURRENT_LLM_CALLS", 8)
+MAX_CONCURRENT_SCREENSHOTS = _secret("MAX_CONCURRENT_SCREENSHOTS", 4)
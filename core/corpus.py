@@ -0,0 +1,98 @@
+import os
+import re
+import json
+import threading
+import pandas as pd
+
+# One lock per corpus folder: background jobs on the same investigation may run at the same time
+_locks = {}
+_locks_guard = threading.Lock()
+
+def _corpus_lock(folder: str) -> threading.Lock:
+    with _locks_guard:
+        return _locks.setdefault(folder, threading.Lock())
+
+
+def get_or_create_corpus_folder():
+    base_folder = os.path.join(os.getcwd(), ".streamlit_cache", "corpora")
+    os.makedirs(base_folder, exist_ok=True)
+    return base_folder
+
+
+class Corpus:
+
+    """
+    Persistent per-investigation store so screenshots added over several days are only processed once.
+    Keeps the `author_checker` result of every chunk keyed by author and chunk content hash,
+    plus the accumulated author DataFrame.
+    Writes hold the investigation's lock and merge with what is on disk, so concurrent jobs on the
+    same investigation don't overwrite each other's results.
+    """
+
+    def __init__(self, name: str, base_folder: str = None):
+        safe_name = re.sub(r"[^\w\-]+", "_", name.strip()) or "default"
+        self.folder = os.path.join(base_folder or get_or_create_corpus_folder(), safe_name)
+        os.makedirs(self.folder, exist_ok=True)
+
+        self.results_path = os.path.join(self.folder, "chunks.json")
+        self.content_path = os.path.join(self.folder, "content.csv")
+        self.lock = _corpus_lock(self.folder)
+
+        with self.lock:
+            self.results = self._load_results()
+
+    def _load_results(self) -> dict:
+        if os.path.exists(self.results_path):
+            with open(self.results_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        return {}
+
+    def new_chunks(self, author: str, chunks_dict: dict) -> dict:
+        """Returns only the chunks of `chunks_dict` that have not been processed for `author` yet."""
+        seen = set(self.results.get(author, {}))
+        new_dict = {}
+        for filename, chunks in chunks_dict.items():
+            for chunk in chunks:
+                if chunk.content_hash in seen:
+                    continue
+                seen.add(chunk.content_hash)
+                new_dict.setdefault(filename, []).append(chunk)
+        return new_dict
+
+    def add_result(self, author: str, chunk, result):
+        # Failed chunks are not cached so they are retried next time
+        if isinstance(result, dict) and "error" not in result:
+            self.results.setdefault(author, {})[chunk.content_hash] = result
+
+    def _read_content(self) -> pd.DataFrame:
+        if os.path.exists(self.content_path):
+            # Everything is text: numeric usernames must stay strings and posts like "NA" must not become NaN
+            return pd.read_csv(self.content_path, encoding="utf-8-sig", dtype=str, keep_default_na=False)
+        return pd.DataFrame({"author": [], "content": []})
+
+    def content_df(self) -> pd.DataFrame:
+        with self.lock:
+            return self._read_content()
+
+    def append_content(self, new_df: pd.DataFrame) -> pd.DataFrame:
+        """Appends the delta DataFrame to the stored one and returns the full corpus."""
+        with self.lock:
+            df = pd.concat([self._read_content(), new_df], ignore_index=True)
+            df = df.drop_duplicates().reset_index(drop=True)
+            tmp_path = self.content_path + ".tmp"
+            df.to_csv(tmp_path, index=False, encoding="utf-8-sig")
+            os.replace(tmp_path, self.content_path)
+        return df
+
+    def save(self):
+        """Merges this run's results into the stored ones, keeping results other jobs saved meanwhile."""
+        with self.lock:
+            merged = self._load_results()
+            for author, results in self.results.items():
+                merged.setdefault(author, {}).update(results)
+            self.results = merged
+
+            tmp_path = self.results_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.results, f, ensure_ascii=False)
+            os.replace(tmp_path, self.results_path)
@@ -0,0 +1,265 @@
+"""
+Offline evaluation of keyword and site suggestions against labelled author corpora.
+
+A dataset is a JSON list of authors:
+
+    [
+      {
+        "author": "kopi_uncle",
+        "train": ["post used to extract keywords", "..."],
+        "held_out": ["other posts by the same author, never shown to the model", "..."],
+        "sites": ["forums.hardwarezone.com.sg", "reddit.com"]      # optional: where they really post
+      },
+      ...
+    ]
+
+A config file is a JSON list of configurations to compare, e.g.
+
+    [
+      {"name": "mini-5", "num_keywords": 5, "route": "cheap"},
+      {"name": "full-8", "num_keywords": 8, "route": "full", "prompt": "keyword_extraction_prompt"}
+    ]
+
+where `prompt` names a prompt template in `core.prompts` and `route` ("cheap" or "full") is used for both the
+keyword and the site calls unless `site_route` is given. Set "sites": false to skip site scoring. LLM responses are cached on disk, so a
+dataset is paid for once in `record` mode and then every tuning session replays it for free:
+
+    python -m core.evaluation dataset.json --configs configs.json --mode record
+    python -m core.evaluation dataset.json --configs configs.json --mode replay
+
+`eval/sample_dataset.json` and `eval/sample_configs.json` are a small worked example. Recording reads the
+Azure settings from the Streamlit secrets or from environment variables of the same name; replay needs neither.
+"""
+import os
+import re
+import json
+import time
+import hashlib
+import argparse
+import threading
+import pandas as pd
+
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor
+from core import constants
+from core import prompts
+from core.keywords import extract_keywords, ideate_websites
+from core.llm_helper import LLMInterface, make_client
+
+
+class CacheMissError(KeyError):
+    """Raised in replay mode when a request has no recorded response."""
+
+
+class ResponseCache:
+
+    """
+    Recorded LLM responses keyed by a hash of the full request (model, messages and parameters).
+    `mode` is "replay" (cache only) or "record" (call the API on a miss and store the response).
+    """
+
+    def __init__(self, folder: str = ".eval_cache", mode: str = "replay"):
+        if mode not in ("replay", "record"):
+            raise ValueError(f"Unknown cache mode: {mode}")
+        self.folder = folder
+        self.mode = mode
+        os.makedirs(folder, exist_ok=True)
+
+    @staticmethod
+    def key(request: dict) -> str:
+        return hashlib.sha256(json.dumps(request, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        path = os.path.join(self.folder, f"{key}.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def set(self, key: str, entry: dict):
+        path = os.path.join(self.folder, f"{key}.json")
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+
+def _replayed_response(entry: dict):
+    logprobs = None
+    if entry.get("first_logprob") is not None:
+        logprobs = SimpleNamespace(content=[SimpleNamespace(logprob=entry["first_logprob"])])
+    return SimpleNamespace(
+        choices=[SimpleNamespace(
+            message=SimpleNamespace(content=entry["content"]),
+            finish_reason=entry.get("finish_reason", "stop"),
+            logprobs=logprobs
+        )],
+        usage=SimpleNamespace(
+            prompt_tokens=entry["prompt_tokens"],
+            completion_tokens=entry["completion_tokens"],
+            prompt_tokens_details=SimpleNamespace(cached_tokens=entry["cached_tokens"]),
+        ),
+    )
+
+
+class CachedLLMInterface(LLMInterface):
+
+    """
+    `LLMInterface` that replays recorded responses. Replayed calls count the recorded latency and tokens,
+    so reports show what a live run would cost. The API client is only created when recording.
+    """
+
+    def __init__(self, cache: ResponseCache):
+        self.cache = cache
+        self.client = None
+        self.unavailable_routes = set()
+        self.max_calls = None
+        self.reset_usage()
+
+    def _create(self, route="full", **kwargs):
+        key = self.cache.key({"model": constants.MODEL_ROUTES[route]["model"], **kwargs})
+        entry = self.cache.get(key)
+
+        if entry is None:
+            if self.cache.mode == "replay":
+                raise CacheMissError(f"No recorded response for request {key[:12]} (run once with --mode record)")
+            if self.client is None:
+                self.client = make_client()
+
+            start = time.perf_counter()
+            response = super()._create(route=route, **kwargs)
+            choice = response.choices[0]
+            logprobs = getattr(choice, "logprobs", None)
+            usage = response.usage
+            details = getattr(usage, "prompt_tokens_details", None)
+            self.cache.set(key, {
+                "content": choice.message.content,
+                "finish_reason": choice.finish_reason,
+                "first_logprob": logprobs.content[0].logprob if logprobs is not None and logprobs.content else None,
+                "prompt_tokens": usage.prompt_tokens or 0,
+                "cached_tokens": (getattr(details, "cached_tokens", 0) or 0) if details else 0,
+                "completion_tokens": usage.completion_tokens or 0,
+                "seconds": time.perf_counter() - start,
+            })
+            return response
+
+        response = _replayed_response(entry)
+        self._record_usage(route, response, entry["seconds"])
+        return response
+
+
+def _matches(keyword: str, text: str) -> bool:
+    return re.search(rf"(?<!\w){re.escape(keyword.strip().lower())}(?!\w)", text.lower()) is not None
+
+def score_keywords(keywords: list, held_out: list, other_posts: list) -> dict:
+    """
+    A keyword is a unique hit if it appears in the author's held-out posts and in no other author's posts,
+    i.e. searching for it would lead to this author and only this author.
+    """
+    unique_hits = [
+        k for k in keywords
+        if any(_matches(k, post) for post in held_out) and not any(_matches(k, post) for post in other_posts)
+    ]
+    found_posts = [post for post in held_out if any(_matches(k, post) for k in unique_hits)]
+    return {
+        "keyword_precision": len(unique_hits) / len(keywords) if keywords else 0.0,
+        "held_out_recall": len(found_posts) / len(held_out) if held_out else 0.0,
+    }
+
+def _domain(site: str) -> str:
+    site = site.strip().lower()
+    site = re.sub(r"^site:", "", site)
+    site = re.sub(r"^https?://", "", site)
+    site = re.sub(r"^www\.", "", site)
+    return site.split("/")[0]
+
+def score_sites(sites: list, labelled_sites: list) -> dict:
+    suggested = {_domain(s) for s in sites}
+    labelled = {_domain(s) for s in labelled_sites}
+    hits = suggested & labelled
+    return {
+        "site_precision": len(hits) / len(suggested) if suggested else 0.0,
+        "site_recall": len(hits) / len(labelled) if labelled else 0.0,
+    }
+
+
+def evaluate_author(config: dict, author: dict, dataset: list, cache: ResponseCache) -> dict:
+    llm = CachedLLMInterface(cache)
+    article = "\n\n".join(author["train"])
+    other_posts = [post for a in dataset if a["author"] != author["author"] for post in a["train"] + a["held_out"]]
+
+    row = {"config": config["name"], "author": author["author"]}
+    try:
+        keywords = extract_keywords(
+            llm=llm,
+            article=article,
+            num_keywords=config.get("num_keywords", 5),
+            prompt=getattr(prompts, config.get("prompt", "keyword_extraction_prompt")),
+            route=config.get("route", "cheap"),
+        )
+        row.update(score_keywords(keywords, author["held_out"], other_posts))
+        row["keywords"] = keywords
+
+        if author.get("sites") and config.get("sites", True):
+            sites = ideate_websites(llm=llm, article=article, keywords_processed=keywords, route=config.get("site_route", config.get("route", "full")))
+            row.update(score_sites(sites, author["sites"]))
+    except CacheMissError:
+        raise
+    except Exception as e:
+        print(f"[{config['name']}] {author['author']} failed: {e}")
+        row["error"] = str(e)
+
+    row["calls"] = llm.total_calls()
+    row["tokens"] = sum(u["prompt_tokens"] + u["completion_tokens"] for u in llm.usage.values())
+    row["cost"] = sum(llm.route_cost(route) for route in llm.usage)
+    row["latency"] = sum(u["seconds"] for u in llm.usage.values())
+    return row
+
+def run_evaluation(dataset: list, configs: list, cache: ResponseCache, max_workers: int = 8):
+    """
+    Evaluates every config on every author in parallel.
+    Returns (per-author rows, per-config summary) DataFrames.
+    """
+    tasks = [(config, author) for config in configs for author in dataset]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        rows = list(executor.map(lambda task: evaluate_author(task[0], task[1], dataset, cache), tasks))
+
+    details = pd.DataFrame(rows)
+    if "error" not in details:
+        details["error"] = None
+    metrics = [c for c in ["keyword_precision", "held_out_recall", "site_precision", "site_recall"] if c in details]
+    summary = details.groupby("config").agg(
+        **{m: (m, "mean") for m in metrics},
+        latency_per_author=("latency", "mean"),
+        tokens=("tokens", "sum"),
+        cost=("cost", "sum"),
+        errors=("error", "count"),
+    )
+    return details, summary.sort_values(metrics[0] if metrics else "cost", ascending=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score keyword/site suggestions against labelled author corpora.")
+    parser.add_argument("dataset", help="JSON list of {author, train, held_out, sites}")
+    parser.add_argument("--configs", help="JSON list of configurations (default: the app's current settings)")
+    parser.add_argument("--mode", choices=["replay", "record"], default="replay")
+    parser.add_argument("--cache", default=".eval_cache", help="Folder of recorded LLM responses")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--output", help="Optional CSV path for the per-author results")
+    args = parser.parse_args()
+
+    with open(args.dataset, "r", encoding="utf-8") as f:
+        dataset = json.load(f)
+    configs = [{"name": "default"}]
+    if args.configs:
+        with open(args.configs, "r", encoding="utf-8") as f:
+            configs = json.load(f)
+
+    details, summary = run_evaluation(dataset, configs, ResponseCache(args.cache, args.mode), args.workers)
+    if args.output:
+        details.to_csv(args.output, index=False, encoding="utf-8-sig")
+    print(summary.to_string(float_format=lambda x: f"{x:.4f}"))
+
+
+if __name__ == "__main__":
+    main()
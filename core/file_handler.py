@@ -1,15 +1,19 @@
 import os
+import time
+import uuid
 import base64
+import shutil
+import hashlib
 import zipfile
-import tempfile
+import itertools
 import streamlit as st
 
-from io import BytesIO  
+from io import BytesIO
 from pathlib import Path
 from PIL import Image
-from pdf2image import convert_from_path
+from pdf2image import convert_from_path, pdfinfo_from_path
 
-Image.MAX_IMAGE_PIXELS = None 
+Image.MAX_IMAGE_PIXELS = None
 
 # File types
 def is_image_file(filename: str) -> bool:
@@ -21,158 +25,245 @@ def is_pdf(filename: str) -> bool:
 def is_zip(filename: str) -> bool:
     return filename.lower().endswith((".zip"))
 
-def split_image_with_overlap(image_path, max_height=1500, overlap=200):
+
+class Chunk:
+
+    """
+    Lightweight descriptor of one image sent to the model: where its pixels come from, not the pixels.
+    `page` is the 0-based PDF page (None for images) and `box` the (left, top, right, bottom) crop (None for the whole image).
+    Pixels are only loaded and encoded when the chunk is dispatched (`iter_base64`), so memory stays flat
+    regardless of upload size. `content_hash` identifies the chunk's content for caching.
+    """
+
+    __slots__ = ("path", "page", "box", "content_hash")
+
+    def __init__(self, path: str, page: int = None, box: tuple = None, content_hash: str = None):
+        self.path = path
+        self.page = page
+        self.box = box
+        self.content_hash = content_hash
+
+    def __repr__(self):
+        return f"Chunk({os.path.basename(self.path)!r}, page={self.page}, box={self.box})"
+
+    def open_source(self, dpi: int = 200) -> Image.Image:
+        """The whole source image: the rendered PDF page or the image file. Use it as a context manager."""
+        if self.page is not None:
+            return convert_from_path(self.path, dpi=dpi, first_page=self.page + 1, last_page=self.page + 1)[0]
+        return Image.open(self.path)
+
+    def load(self, dpi: int = 200) -> Image.Image:
+        with self.open_source(dpi) as img:
+            return img.crop(self.box) if self.box else img.copy()
+
+    def to_base64(self) -> str:
+        if self.page is None and self.box is None:
+            # Whole image: send the file as-is rather than re-encoding it
+            with open(self.path, "rb") as image_file:
+                return base64.b64encode(image_file.read()).decode('utf-8')
+        return encode_png(self.load())
+
+
+def encode_png(img: Image.Image) -> str:
+    buffered = BytesIO()
+    img.save(buffered, format="PNG")
+    return base64.b64encode(buffered.getvalue()).decode('utf-8')
+
+def iter_base64(chunks):
     """
-    Splits a tall image into smaller overlapping chunks vertically.
-    Returns list of PIL Image objects.
+    Yields (chunk, base64 PNG) for each chunk. Consecutive chunks of the same source (the crops of a tall
+    image) share one decode instead of decoding the whole image once per crop.
+    A chunk that cannot be loaded is yielded with the exception instead, so one bad file doesn't stop the rest.
+    Makes no Streamlit calls, so it can run as the source of `pipeline.run_pipeline`.
     """
-    img = Image.open(image_path)
-    width, height = img.size
+    for _, group in itertools.groupby(chunks, key=lambda c: (c.path, c.page)):
+        group = list(group)
+        done = 0
+        try:
+            if len(group) == 1:
+                yield group[0], group[0].to_base64()
+                done += 1
+                continue
+
+            with group[0].open_source() as img:
+                for chunk in group:
+                    yield chunk, encode_png(img.crop(chunk.box) if chunk.box else img)
+                    done += 1
+        except Exception as e:
+            for chunk in group[done:]:
+                yield chunk, e
+
+
+def file_digest(path) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(block)
+    return sha.hexdigest()
 
+def _chunk_hash(file_hash, page=None, box=None) -> str:
+    return hashlib.sha256(f"{file_hash}:{page}:{box}".encode("utf-8")).hexdigest()
+
+def split_boxes(width, height, max_height=1500, overlap=200):
+    """
+    Crop boxes that split a tall image into smaller overlapping chunks vertically.
+    Returns [None] if the image does not need splitting.
+    """
     if height <= max_height:
-        return [img]
+        return [None]
 
-    chunks = []
+    boxes = []
     start = 0
 
     while start < height:
         end = min(start + max_height, height)
-        box = (0, start, width, end)
-        chunk = img.crop(box)
-        chunks.append(chunk)
+        boxes.append((0, start, width, end))
         if end == height:
             break
         start += max_height - overlap
 
-    return chunks
+    return boxes
+
+def image_chunks(filepath):
+    """
+    Describes an image file as chunks, split into overlapping crops if it is very tall (>1500px).
+    Only the image header is read. Makes no Streamlit calls, so it is safe to run in a worker thread.
+    """
+    with Image.open(filepath) as img:
+        width, height = img.size
+
+    file_hash = file_digest(filepath)
+    return [
+        Chunk(filepath, box=box, content_hash=_chunk_hash(file_hash, box=box))
+        for box in split_boxes(width, height)
+    ]
+
+def pdf_chunks(filepath):
+    """Describes each page of a PDF as a chunk; pages are only rendered when dispatched."""
+    file_hash = file_digest(filepath)
+    num_pages = pdfinfo_from_path(filepath)["Pages"]
+    return [Chunk(filepath, page=i, content_hash=_chunk_hash(file_hash, page=i)) for i in range(num_pages)]
 
 def process_image_file(filepath, file):
     """
-    Takes an image file path and processes it into base64-encoded images.
+    Takes an image file path and processes it into chunks.
     If the image is very tall (>1500px), it splits it into overlapping chunks.
     """
-    base64_images = []
+    chunks = []
 
     try:
-        img = Image.open(filepath)
-        width, height = img.size
-
-        if height > 1500:
-            st.info(f"Splitting tall image: {file} ({height}px height)")
-            chunks = split_image_with_overlap(filepath)
-            for i, chunk in enumerate(chunks):
-                buffered = BytesIO()
-                chunk.save(buffered, format="PNG")
-                encoded = base64.b64encode(buffered.getvalue()).decode('utf-8')
-                base64_images.append(encoded)
-        else:
-            with open(filepath, "rb") as image_file:
-                encoded = base64.b64encode(image_file.read()).decode('utf-8')
-                base64_images.append(encoded)
+        chunks = image_chunks(filepath)
+        if len(chunks) > 1:
+            st.info(f"Splitting tall image: {file} ({chunks[-1].box[3]}px height)")
 
     except Exception as e:
         st.error(f"Failed to process image {file}: {e}")
 
-    return base64_images
-  
-def process_pdf_file(filepath, file):  
-    base64_images = []  
-    try:  
-        st.write(f"Extracting pages from **{file}**...")  
-        pdf_images = convert_from_path(filepath)  
-        for i, page in enumerate(pdf_images):  
-            caption = f"{file} - Page {i+1}"  
-            # st.image(page, caption=caption, use_container_width=True)  
-  
-            # Save page image to buffer, then encode to base64  
-            buffered = BytesIO()  
-            page.save(buffered, format="PNG")  
-            encoded = base64.b64encode(buffered.getvalue()).decode('utf-8')  
-            base64_images.append(encoded)  
-    except Exception as e:  
-        st.error(f"Failed to process {file}: {e}")  
-    return base64_images  
-
-  
-def extract_zip_and_show(uploaded_file):  
-    st.success("ZIP file uploaded!")  
-    files_dict = {}  
-  
-    with tempfile.TemporaryDirectory() as tmpdir:  
-        # Save uploaded zip to temp file  
-        zip_path = os.path.join(tmpdir, "uploaded_file.zip")  
-        with open(zip_path, "wb") as f:  
-            # f.write(uploaded_file.getbuffer())  
-            f.write(uploaded_file.read())
-  
-        # Extract ZIP  
-        with zipfile.ZipFile(zip_path, 'r') as zip_ref:  
-            zip_ref.extractall(tmpdir)  
-  
-        st.info("Extracted files. Checking contents...")  
-  
-        for root, _, files in os.walk(tmpdir):  
-            for file in files:  
-                filepath = os.path.join(root, file)  
-  
-                if is_image_file(file):  
-                    base64_images = process_image_file(filepath, file)  
-                elif is_pdf(file):  
-                    base64_images = process_pdf_file(filepath, file)  
-                else:  
-                    base64_images = []  
-  
-                if base64_images:  
-                    files_dict[file] = base64_images  
-  
-        st.success(f"Done! {sum(len(v) for v in files_dict.values())} image(s) loaded.")  
-        return files_dict 
-
-def extract_from_image_or_pdf(uploaded_file, file_type):  
-    if file_type == 'pdf':
-        suffix = '.pdf'
-    elif file_type == 'img':
-        suffix = '.img'
-
-    # Save uploaded_file to a temp file  
-    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tf:  
-        # tf.write(uploaded_file.getbuffer())  # Write bytes to temp file  
-        tf.write(uploaded_file.read())
-        temp_file_path = tf.name  
-    # Get a suitable filename for display (if available)  
-    try:  
-        filename = uploaded_file.name  
-    except AttributeError:  
-        filename = os.path.basename(temp_file_path) 
+    return chunks
+
+def process_pdf_file(filepath, file):
+    chunks = []
+    try:
+        st.write(f"Extracting pages from **{file}**...")
+        chunks = pdf_chunks(filepath)
+    except Exception as e:
+        st.error(f"Failed to process {file}: {e}")
+    return chunks
+
+
+# Uploads are kept on disk (not in memory) until their chunks have been processed
+def get_or_create_upload_folder(max_age=24 * 3600):
+    base_folder = os.path.join(os.getcwd(), ".streamlit_cache", "uploads")
+    os.makedirs(base_folder, exist_ok=True)
+
+    # Drop uploads from earlier runs
+    now = time.time()
+    for name in os.listdir(base_folder):
+        path = os.path.join(base_folder, name)
+        if now - os.path.getmtime(path) > max_age:
+            shutil.rmtree(path, ignore_errors=True)
+
+    upload_folder = os.path.join(base_folder, uuid.uuid4().hex)
+    os.makedirs(upload_folder)
+    return upload_folder
+
+def save_upload(uploaded_file, folder, filename):
+    path = os.path.join(folder, filename)
+    with open(path, "wb") as f:
+        shutil.copyfileobj(uploaded_file, f)
+    return path
+
+def extract_zip_and_show(uploaded_file):
+    st.success("ZIP file uploaded!")
+    files_dict = {}
+
+    upload_folder = get_or_create_upload_folder()
+    zip_path = save_upload(uploaded_file, upload_folder, "uploaded_file.zip")
+
+    # Extract ZIP
+    extract_folder = os.path.join(upload_folder, "extracted")
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        zip_ref.extractall(extract_folder)
+    os.remove(zip_path)
+
+    st.info("Extracted files. Checking contents...")
+
+    for root, _, files in os.walk(extract_folder):
+        for file in files:
+            filepath = os.path.join(root, file)
+
+            if is_image_file(file):
+                chunks = process_image_file(filepath, file)
+            elif is_pdf(file):
+                chunks = process_pdf_file(filepath, file)
+            else:
+                chunks = []
+
+            if chunks:
+                files_dict[file] = chunks
+
+    st.success(f"Done! {sum(len(v) for v in files_dict.values())} image(s) loaded.")
+    return files_dict
+
+def extract_from_image_or_pdf(uploaded_file, file_type):
+    # Get a suitable filename for display (if available)
+    try:
+        filename = uploaded_file.name
+    except AttributeError:
+        filename = f"upload.{'pdf' if file_type == 'pdf' else 'img'}"
+    filename = os.path.basename(filename)
+
+    file_path = save_upload(uploaded_file, get_or_create_upload_folder(), filename)
 
     if file_type == 'pdf':
-        base64_images = process_pdf_file(temp_file_path, filename)  
+        chunks = process_pdf_file(file_path, filename)
     elif file_type == 'img':
-        base64_images = process_image_file(temp_file_path, filename)   
-    
-    
-    files_dict = {} 
-    if base64_images:  
-        files_dict[filename] = base64_images
-    
-    st.success(f"Done! {sum(len(v) for v in files_dict.values())} image(s) loaded.")  
-    
-    return files_dict  
+        chunks = process_image_file(file_path, filename)
+
+
+    files_dict = {}
+    if chunks:
+        files_dict[filename] = chunks
+
+    st.success(f"Done! {sum(len(v) for v in files_dict.values())} image(s) loaded.")
+
+    return files_dict
 
 
 def handle_uploaded_file(uploaded_file):
     """
     Handles a single uploaded file.
-    Returns a dict where key is filename and values are base64 codes of each image in each file.
+    Returns a dict where key is filename and values are the `Chunk`s of each image in each file.
     """
-    filename = uploaded_file.name      
+    filename = uploaded_file.name
+    results = {}
 
     if is_pdf(filename):
         results = extract_from_image_or_pdf(uploaded_file, file_type='pdf')
     elif is_image_file(filename):
         results = extract_from_image_or_pdf(uploaded_file, file_type='img')
     elif is_zip(filename):
-        results = extract_zip_and_show(uploaded_file) 
+        results = extract_zip_and_show(uploaded_file)
     else:
         st.warning('Only pdf, png, jpg, jpeg, webp or a zipped file that only contains these file types can be uploaded')
     return results
@@ -180,7 +271,7 @@ def handle_uploaded_file(uploaded_file):
 def handle_local_files(file_paths):
     """
     Handles a list of local image or PDF file paths.
-    Returns a dict where key is filename and value is base64-encoded content.
+    Returns a dict where key is filename and value is the file's `Chunk`s, pointing at the files in place.
     """
     results = {}
 
@@ -188,12 +279,14 @@ def handle_local_files(file_paths):
         filename = Path(path).name
 
         if is_pdf(filename):
-            with open(path, "rb") as f:
-                results.update(extract_from_image_or_pdf(f, file_type='pdf'))
+            chunks = process_pdf_file(path, filename)
         elif is_image_file(filename):
-            with open(path, "rb") as f:
-                results.update(extract_from_image_or_pdf(f, file_type='img'))
+            chunks = process_image_file(path, filename)
         else:
             st.warning(f"Unsupported file format: {filename}. Skipping.")
+            continue
+
+        if chunks:
+            results[filename] = chunks
 
-    return results
\ No newline at end of file
+    return results
@@ -1,41 +1,29 @@
 import re
-import json
 import streamlit as st
 import pandas as pd
-import zipfile
 import os
+import time
 import uuid
 import requests
 from urllib.parse import urlparse
 from core import constants
 from core import file_handler
+from core import jobs
+from core import limits
+from core import pipeline
 from core import prompts
+from core import screenshot_store
+from core import search
+from core import text_cleaning
+from core.author_index import AuthorIndex, content_counts
+from core.budget import ExtractionBudget, count_words, order_by_yield
+from core.corpus import Corpus, get_or_create_corpus_folder
+from core.keywords import extract_keywords, ideate_websites
 from core.llm_helper import LLMInterface
+from core.screenshot_store import ScreenshotStore
 
-def extract_keywords(llm: LLMInterface, article: str, num_keywords: int):
-
-    keywords_raw = llm.llm_text(
-        system_prompt=prompts.keyword_extraction_prompt.format(num_keywords=num_keywords),
-        user_content=article
-    )
-    keywords_processed = llm.post_process_llm_response(
-        processing_prompt=prompts.process_into_list_prompt, 
-        response_content=keywords_raw
-    )
-    return keywords_processed
-
-def ideate_websites(llm: LLMInterface, article: str, keywords_processed: list):
-    keywords_str = ", ".join(keywords_processed)
-    websites_raw = llm.llm_text(
-        system_prompt=prompts.website_ideation_sys_prompt,
-        user_content=prompts.website_ideation_prompt.format(article=article, keyword_list=keywords_str)
-    )
-    websites_processed = llm.post_process_llm_response(
-        processing_prompt=prompts.process_into_list_prompt, 
-        response_content=websites_raw
-    )
-
-    return websites_processed
+# Session state key of the URL list, so search hits can be sent to the screenshot capture path
+URL_INPUT_KEY = "url_input"
 
 def debug_base64_encoding(base64_str):
     import base64
@@ -57,61 +45,93 @@ def author_checker(llm: LLMInterface, author: str, base64_str: str) -> dict:
     """Checks if the author is present in the image and extracts content only if so."""
     
     # Step 1: Check if author appears
-    presence_response = llm.llm_image(
+    presence_response = llm.llm_classify(
         prompt=prompts.author_checker_prompt.format(author=author),
-        img_base64=base64_str
-    ).strip().lower()
+        img_base64=base64_str,
+        choices=("yes", "no"),
+        system_prompt=prompts.author_checker_system_prompt,
+        route="cheap"
+    )
 
     # print(presence_response)
 
     if presence_response == "yes":
         # Step 2: Extract content if author is present
         try:
-            extraction_response = llm.llm_image(
+            return llm.llm_structured(
+                schema_name="author_content",
                 prompt=prompts.author_content_extraction_prompt.format(author=author),
-                img_base64=base64_str
+                img_base64=base64_str,
+                system_prompt=prompts.author_content_extraction_system_prompt
             )
-            try:
-                parsed = json.loads(extraction_response)
-                return parsed if isinstance(parsed, dict) and "content" in parsed else {"content": []}
-            except json.JSONDecodeError as e:
-                print(f"Failed to parse JSON: {e}")  
-            
         except Exception as e:
+            # Keep the page visible as a failure rather than dropping it
             print(f"Error during extraction: {e}")
-            return {"content": []}
+            return {"content": [], "error": str(e)}
     else:
         # Author not present, return empty content
         return {"content": []}
 
 
-def extract_author_content(llm: LLMInterface, author: str, base64_dict: dict):
+def extract_author_content(llm: LLMInterface, author: str, chunks_dict: dict, on_result=None, report=None,
+                           budget: ExtractionBudget = None):
+    """
+    Runs `author_checker` on every chunk and returns the per-chunk results.
+    Makes no Streamlit calls so it can run as a background job; progress goes to `report(done, total, message)`.
+    Chunks are encoded in a pipeline thread just ahead of dispatch, so encoding overlaps with inference.
+    `on_result(chunk, result)` is called after each chunk, e.g. to cache it in a `Corpus`.
+    With a `budget`, chunks are processed densest text first and the run stops once the budget is met,
+    so fewer results than chunks may be returned.
+    """
     content_list = []
-    total_images = sum(len(lst) for lst in base64_dict.values())
-    progress_text = st.empty()
-    progress_bar = st.progress(0)
+    total_images = sum(len(lst) for lst in chunks_dict.values())
+
+    if budget is not None:
+        ordered = order_by_yield(chunks_dict)
+    else:
+        ordered = [(filename, chunk) for filename, chunks in chunks_dict.items() for chunk in chunks]
 
     processed = 0
-    for filename, list_of_base64 in base64_dict.items(): 
-        for base64_str in list_of_base64:
-            try:
-                # Testing
-                # debug_base64_encoding(base64_str)
+    stream = pipeline.run_pipeline(source=file_handler.iter_base64(chunk for _, chunk in ordered), stages=[])
+    for chunk, base64_str in stream:
+        if budget is not None and budget.met(count_words(content_list), llm.total_calls()):
+            # Closing the pipeline stops the encoder
+            stream.close()
+            break
 
-                content_raw = author_checker(llm, author, base64_str)
-                content_list.append(content_raw)
-            except Exception as e:
-                st.error(f"Error during inference: {e}")
+        try:
+            # Testing
+            # debug_base64_encoding(base64_str)
+
+            if isinstance(base64_str, Exception):
+                raise base64_str
+            content_raw = author_checker(llm, author, base64_str)
+            content_list.append(content_raw)
+            if on_result is not None:
+                on_result(chunk, content_raw)
+        except Exception as e:
+            print(f"Error during inference: {e}")
+            content_list.append({"content": [], "error": str(e)})
 
-            # Update progress
-            processed += 1
-            progress_text.text(f"Processed {processed} of {total_images} images...")
-            progress_bar.progress(processed / total_images)
+        # Update progress
+        processed += 1
+        if report is not None:
+            report(processed, total_images, f"Processed {processed} of {total_images} images...")
+
+    return content_list
+
+def coverage_message(processed: int, total: int, stopped_early: bool, unit: str = "image(s)") -> str:
+    """`stopped_early` is whether the budget was met when the run stopped."""
+    if not stopped_early:
+        return f"Triage mode: the budget was not reached, so all {total} {unit} were processed."
+    pct = 100 * processed / total if total else 100
+    return f"Triage mode: processed {processed} of {total} {unit} ({pct:.0f}% of the corpus) before the budget was met."
 
-    # Clear progress indicators after completion (optional)
-    progress_text.empty()
-    progress_bar.empty()
+def failed_chunks(content_list: list) -> list:
+    return [c["error"] for c in content_list if isinstance(c, dict) and "error" in c]
 
+def build_author_content_df(author: str, content_list: list):
+    """Merges the per-chunk `author_checker` results into a cleaned DataFrame."""
     input_dicts = []
     input_dicts = [s for s in content_list if isinstance(s, dict)]
 
@@ -124,19 +144,159 @@ def extract_author_content(llm: LLMInterface, author: str, base64_dict: dict):
         "content": merged_content
     })
 
-    # Remove words that start with 'https://'
-    df['content'] = df['content'].apply(
-        lambda x: ' '.join(word for word in x.split() if not word.startswith("https://")) if isinstance(x, str) else x
-    )
+    # Remove links, drop empty rows and duplicates
+    return text_cleaning.clean_content(df)
+
+def extract_author_content_incremental(llm: LLMInterface, author: str, chunks_dict: dict, investigation: str, report=None,
+                                       budget: ExtractionBudget = None):
+    """
+    Only runs inference on chunks the investigation's corpus has not seen for this author,
+    appends their content to the stored DataFrame and returns the full corpus for the author,
+    the per-chunk results of this run and a summary message.
+    """
+    corpus = Corpus(investigation)
+    new_dict = corpus.new_chunks(author, chunks_dict)
 
-    # Drop NaN/None rows
-    df = df[df['content'].notna()] 
-    # Drop rows where 'content' is empty or just whitespace
-    df = df[df['content'].astype(str).str.strip().astype(bool)] 
-    # Drop Duplicates
-    df = df.drop_duplicates().reset_index(drop=True)
+    total_images = sum(len(lst) for lst in chunks_dict.values())
+    new_images = sum(len(lst) for lst in new_dict.values())
+    message = f"{new_images} new of {total_images} image(s) for investigation '{investigation}'."
+
+    content_list = []
+    if new_dict:
+        try:
+            content_list = extract_author_content(
+                llm=llm, author=author, chunks_dict=new_dict,
+                on_result=lambda chunk, result: corpus.add_result(author, chunk, result),
+                report=report,
+                budget=budget
+            )
+        finally:
+            # Keep whatever finished even if the run is interrupted
+            corpus.save()
+        df = corpus.append_content(build_author_content_df(author, content_list))
+        if budget is not None:
+            # Chunks skipped by the budget are not cached, so a later run picks them up
+            stopped_early = budget.met(count_words(content_list), llm.total_calls())
+            message += " " + coverage_message(len(content_list), new_images, stopped_early, "new image(s)")
+    else:
+        df = corpus.content_df()
+
+    return df[df["author"] == author].reset_index(drop=True), content_list, message
+
+def run_screenshot_extraction(author: str, chunks_dict: dict, investigation: str = "", report=None,
+                              budget: ExtractionBudget = None) -> dict:
+    """Background job: author content extraction over the chunks of uploaded or local screenshots."""
+    llm = LLMInterface(max_calls=budget.max_calls if budget is not None else None)
+    message = None
+    if investigation.strip():
+        content_df, content_list, message = extract_author_content_incremental(
+            llm=llm, author=author, chunks_dict=chunks_dict, investigation=investigation, report=report, budget=budget
+        )
+    else:
+        content_list = extract_author_content(llm=llm, author=author, chunks_dict=chunks_dict, report=report, budget=budget)
+        content_df = build_author_content_df(author, content_list)
+        if budget is not None:
+            stopped_early = budget.met(count_words(content_list), llm.total_calls())
+            message = coverage_message(len(content_list), sum(len(lst) for lst in chunks_dict.values()), stopped_early)
+
+    return {
+        "content_df": content_df,
+        "failed": failed_chunks(content_list),
+        "usage": llm.usage_summary(),
+        "message": message,
+    }
+
+@st.cache_resource
+def get_job_queue():
+    # One worker pool per server process, shared by all sessions
+    return jobs.JobQueue(workers=constants.JOB_WORKERS)
+
+def get_user_id():
+    # Logged-in username (streamlit-authenticator) if there is one, otherwise one id per browser session
+    if st.session_state.get("username"):
+        return st.session_state["username"]
+    if "user_id" not in st.session_state:
+        st.session_state["user_id"] = uuid.uuid4().hex
+    return st.session_state["user_id"]
+
+def submit_job(job_key: str, fn, **kwargs):
+    job = get_job_queue().submit(get_user_id(), fn, **kwargs)
+    st.session_state[job_key] = job.id
+
+def wait_for_job(job_key: str, poll_seconds: float = 1.0):
+    """
+    Shows the status of the job stored under `job_key` and reruns the page until it has finished.
+    Returns the job's result, or None if it failed. A failed or expired job stays recorded under `job_key`
+    (so later widget interactions don't submit it again) until the user clicks "Retry".
+    """
+    error_key = f"{job_key}_error"
+    if error_key not in st.session_state:
+        queue = get_job_queue()
+        job = queue.get(st.session_state[job_key])
+        if job is None:
+            st.session_state[error_key] = "The job has expired."
+        elif not job.finished:
+            done, total, message = job.progress
+            if job.status == "queued":
+                st.info(f"Queued — {queue.position(job)} job(s) ahead of yours.")
+            else:
+                st.progress(done / total if total else 0, text=message or "Running...")
+            time.sleep(poll_seconds)
+            st.rerun()
+        elif job.status == "failed":
+            st.session_state[error_key] = job.error
+
+    if error_key in st.session_state:
+        st.error(f"Error during inference: {st.session_state[error_key]}")
+        if st.button("Retry", key=f"{job_key}_retry"):
+            del st.session_state[job_key]
+            del st.session_state[error_key]
+            st.rerun()
+        return None
+
+    del st.session_state[job_key]
+    if job.result.get("message"):
+        st.info(job.result["message"])
+    if job.result["failed"]:
+        st.warning(f"Could not extract content from {len(job.result['failed'])} image(s): {job.result['failed'][0]}")
+    st.caption(job.result["usage"])
+    return job.result
+
+@st.cache_resource
+def get_author_index():
+    index = AuthorIndex()
+    if not len(index):
+        # First run: seed the archive with every stored investigation
+        index.add_from_corpora(get_or_create_corpus_folder())
+        if len(index):
+            index.save()
+    return index
+
+def show_similar_authors(content_df, run_key: str, k=5):
+    """Compares the content stored under `run_key` against the archive; its style counts are computed once per run."""
+    if content_df is None or content_df.empty:
+        return
+
+    index = get_author_index()
+    author = str(content_df["author"].iloc[0])
+
+    counts_key = f"{run_key}_style_counts"
+    if counts_key not in st.session_state:
+        st.session_state[counts_key] = content_counts(content_df)
+    counts = st.session_state[counts_key]
+
+    st.subheader("Similar authors in archive")
+    archive_key = st.text_input("Archive this author as:", value=author)
+
+    if len(index):
+        st.dataframe(index.search(counts, k=k, exclude=archive_key), use_container_width=True)
+    else:
+        st.info("The archive is empty. Add authors to compare new cases against them.")
 
-    return df
+    if archive_key and st.button("Add to archive"):
+        index.add(archive_key, counts)
+        index.save()
+        st.success(f"Added '{archive_key}' to the archive ({len(index)} author(s)).")
 
 def extract_from_text(llm, text_input=None):
     num_keywords = st.number_input("Number of keywords to generate:", value=5, min_value=1, max_value=20)
@@ -147,9 +307,12 @@ def extract_from_text(llm, text_input=None):
     if text_input and num_keywords and re.search(r'\w', text_input):
         if st.button("Extract keywords"):
             with st.spinner("Running inference..."):
+                llm.reset_usage()
                 keywords = extract_keywords(llm=llm, article=text_input, num_keywords=num_keywords)
                 st.session_state['keywords'] = keywords
                 st.session_state.pop('sites', None)  # Clear previous sites
+                st.session_state.pop('search_results', None)
+            st.caption(llm.usage_summary())
 
     if 'keywords' in st.session_state:
         st.subheader("Extracted keywords:")
@@ -163,10 +326,58 @@ def extract_from_text(llm, text_input=None):
                     keywords_processed=st.session_state['keywords']
                 )
                 st.session_state['sites'] = sites
+                st.session_state.pop('search_results', None)
 
     if 'sites' in st.session_state:
         st.subheader("Suggested websites to search:")
         st.write(st.session_state['sites'])
+        search_for_author(st.session_state['keywords'], st.session_state['sites'])
+
+def _send_urls_to_capture(urls):
+    st.session_state[URL_INPUT_KEY] = "\n".join(urls)
+
+def search_for_author(keywords: list, sites: list):
+    """Runs the keyword x site query matrix and offers the top hits to the screenshot capture path."""
+    if not constants.SERPER_API_KEY_LIST:
+        st.info("Add SERPER_API_KEY_LIST to the secrets to run these searches here.")
+        return
+
+    queries = search.build_queries(keywords, sites)
+    if st.button(f"Run {len(queries)} searches"):
+        with st.spinner("Searching..."):
+            st.session_state['search_results'], errors = search.run_search(
+                queries,
+                backend=search.SerperBackend(constants.SERPER_API_KEY_LIST),
+                cache=search.SearchCache()
+            )
+        if errors:
+            st.warning(f"{len(errors)} of {len(queries)} searches failed: {next(iter(errors.values()))}")
+
+    results = st.session_state.get('search_results')
+    if results is not None:
+        st.subheader("Search results:")
+        st.dataframe(results, use_container_width=True)
+
+        top_n = st.number_input("Number of top hits to capture:", value=min(10, max(len(results), 1)), min_value=1, max_value=max(len(results), 1))
+        st.button(
+            "Send top hits to screenshot capture",
+            on_click=_send_urls_to_capture,
+            args=(results["search_result_url"].head(top_n).tolist(),),
+            help="Fills the URL list of the 'Enter URLs' input method."
+        )
+
+def budget_inputs(key: str):
+    """Optional triage settings; returns an `ExtractionBudget` or None for a full run."""
+    with st.expander("Triage mode (stop early once enough content is found)"):
+        enabled = st.checkbox("Enable triage mode", key=f"{key}_budget_enabled")
+        max_words = st.number_input("Target number of words (0 = no limit):", value=300, min_value=0, step=50, key=f"{key}_budget_words")
+        max_calls = st.number_input(
+            "Max LLM calls (0 = no limit):", value=20, min_value=0, step=5, key=f"{key}_budget_calls",
+            help="Never exceeded. An image takes 2 calls when the author is on it, more if an answer is escalated or retried."
+        )
+    if not enabled or not (max_words or max_calls):
+        return None
+    return ExtractionBudget(max_words=max_words, max_calls=max_calls)
 
 def extract_content_from_screenshots(llm, screenshot_files=None):
     uploaded_file = None
@@ -179,25 +390,36 @@ def extract_content_from_screenshots(llm, screenshot_files=None):
                                          )
     
     author = st.text_area("Author/ Username (to extract what they wrote):")
+    investigation = st.text_input(
+        "Investigation name (optional — new screenshots are added to this investigation's corpus without reprocessing old ones):"
+    )
+
+    budget = budget_inputs("screenshots")
 
     # Only run once per author + file combo
-    run_key = f"inference_run_{author}_{hash(str(screenshot_files) + str(uploaded_file))}"
+    run_key = f"inference_run_{author}_{investigation}_{budget}_{hash(str(screenshot_files) + str(uploaded_file))}"
 
     # Check if content already exists
     if run_key not in st.session_state and (uploaded_file or screenshot_files) and author:
-        if screenshot_files:
-            base64_dict = file_handler.handle_local_files(screenshot_files)
-        else:
-            base64_dict = file_handler.handle_uploaded_file(uploaded_file)
-
-        with st.spinner("Running inference..."):
-            content_df = extract_author_content(llm=llm, author=author, base64_dict=base64_dict)
-        
-        # Save to session
-        st.session_state[run_key] = content_df
-    else:
-        content_df = st.session_state.get(run_key)
+        job_key = f"{run_key}_job"
+        if job_key not in st.session_state:
+            if screenshot_files:
+                chunks_dict = file_handler.handle_local_files(screenshot_files)
+            else:
+                chunks_dict = file_handler.handle_uploaded_file(uploaded_file)
 
+            submit_job(job_key, run_screenshot_extraction, author=author, chunks_dict=chunks_dict, investigation=investigation, budget=budget)
+
+        result = wait_for_job(job_key)
+        if result is not None:
+            # Save to session
+            st.session_state[run_key] = result["content_df"]
+
+    content_df = show_author_content(st.session_state.get(run_key))
+    show_similar_authors(content_df, run_key)
+    return content_df
+
+def show_author_content(content_df):
     if content_df is not None:
         st.subheader("Extracted Author's Content")
         st.dataframe(content_df, use_container_width=True)
@@ -213,12 +435,29 @@ def extract_content_from_screenshots(llm, screenshot_files=None):
 
         return content_df
 
-def get_screenshots(urls, SCREENSHOTMACHINE_API_KEY_LIST, output_folder):
+def screenshot_filename(url):
+    parsed = urlparse(url)
+    domain = parsed.hostname.replace('.', '_') if parsed.hostname else "unknown"
+    path = parsed.path.strip("/").replace("/", "_")
+    if not path:
+        path = "_"
+    return f"{domain}_{path}.png"
+
+def iter_screenshots(urls, SCREENSHOTMACHINE_API_KEY_LIST, store):
+    """
+    Yields (filename, path) of each screenshot as soon as it is available, reusing fresh captures from
+    the screenshot store so the API is only called for new or expired URLs.
+    Makes no Streamlit calls, so it can run as the source of `pipeline.run_pipeline`.
+    """
     screenshot_api = "https://api.screenshotmachine.com"
     key_index = 0
-    saved_images = []
 
     for url in urls:
+        cached = store.get(url)
+        if cached is not None:
+            yield cached
+            continue
+
         while key_index < len(SCREENSHOTMACHINE_API_KEY_LIST):
             current_key = SCREENSHOTMACHINE_API_KEY_LIST[key_index]
             screenshot_params = {
@@ -230,22 +469,11 @@ def get_screenshots(urls, SCREENSHOTMACHINE_API_KEY_LIST, output_folder):
             }
 
             try:
-                response = requests.get(screenshot_api, params=screenshot_params)
+                with limits.SCREENSHOT_SLOTS:
+                    response = requests.get(screenshot_api, params=screenshot_params)
                 if response.status_code == 200:
 
-                    parsed = urlparse(url)
-                    domain = parsed.hostname.replace('.', '_') if parsed.hostname else "unknown"
-                    path = parsed.path.strip("/").replace("/", "_")
-                    if not path:
-                        path = "_"
-                    filename = f"{domain}_{path}.png"
-                    filepath = os.path.join(output_folder, filename)  # Save inside correct folder
-
-                    with open(filepath, "wb") as f:
-                        f.write(response.content)
-
-                    saved_images.append(filepath)
-                    st.success(f"Screenshot: '{filename}'")
+                    yield store.put(url, screenshot_filename(url), response.content)
 
                     break  # move to next URL
 
@@ -264,7 +492,14 @@ def get_screenshots(urls, SCREENSHOTMACHINE_API_KEY_LIST, output_folder):
             print("All API keys exhausted.")
             break
 
-    return saved_images
+@st.cache_resource
+def get_screenshot_store():
+    # One store per server process, shared by all sessions
+    return ScreenshotStore(
+        folder=get_or_create_screenshot_folder(),
+        ttl=constants.SCREENSHOT_TTL_SECONDS,
+        max_bytes=constants.SCREENSHOT_CACHE_MAX_BYTES
+    )
 
 # Use a persistent directory in your project (won't be deleted on rerun)
 def get_or_create_screenshot_folder():
@@ -272,127 +507,130 @@ def get_or_create_screenshot_folder():
     os.makedirs(base_folder, exist_ok=True)
     return base_folder
 
-def get_screenshot_from_urls():
-    st.subheader("Enter URLs (one per line)")
-    url_input = st.text_area("Paste the URLs here:", height=200)
+def _chunk_screenshot(screenshot):
+    filename, filepath = screenshot
+    try:
+        return filename, filepath, file_handler.image_chunks(filepath)
+    except Exception as e:
+        print(f"Failed to process image {filename}: {e}")
+        return filename, filepath, []
+
+def _encode_screenshot(chunked):
+    # The screenshot is decoded once for all of its crops
+    filename, filepath, chunks = chunked
+    return filename, filepath, [base64_str for _, base64_str in file_handler.iter_base64(chunks)]
+
+def stream_author_content_from_urls(llm: LLMInterface, author: str, urls: list, store: ScreenshotStore, report=None,
+                                    budget: ExtractionBudget = None):
+    """
+    Captures, splits, encodes and runs inference on the URLs as a pipeline: each screenshot is sent
+    to the vision model as soon as it is encoded, while the next URLs are still being captured and encoded.
+    Returns the (filename, path) of each screenshot and the per-chunk `author_checker` results.
+    Makes no Streamlit calls so it can run as a background job.
+    With a `budget`, capture stops as soon as the budget is met (screenshots are taken in URL order).
+    """
+    screenshots = []
+    content_list = []
 
-    if url_input.strip():
-        urls = [u.strip() for u in url_input.strip().splitlines() if u.strip()]
-        st.info(f"Processing {len(urls)} URLs...")
+    processed = 0
+    stream = pipeline.run_pipeline(
+        source=iter_screenshots(urls, constants.SCREENSHOTMACHINE_API_KEY_LIST, store),
+        stages=[_chunk_screenshot, _encode_screenshot],
+    )
+    for filename, filepath, encoded_chunks in stream:
+        screenshots.append((filename, filepath))
 
-        if "screenshot_result" not in st.session_state or st.session_state.get("last_urls") != urls:
-            with st.spinner("Taking screenshots..."):
-                output_folder = get_or_create_screenshot_folder()
+        for base64_str in encoded_chunks:
+            if budget is not None and budget.met(count_words(content_list), llm.total_calls()):
+                break
+            try:
+                if isinstance(base64_str, Exception):
+                    raise base64_str
+                content_raw = author_checker(llm, author, base64_str)
+                content_list.append(content_raw)
+            except Exception as e:
+                print(f"Error during inference: {e}")
+                content_list.append({"content": [], "error": str(e)})
 
-                # Create a unique subfolder to store this session's screenshots
-                unique_folder = os.path.join(output_folder, str(uuid.uuid4()))
-                os.makedirs(unique_folder, exist_ok=True)
+            processed += 1
+            if report is not None:
+                report(len(screenshots), len(urls), f"Processed {processed} image(s) from {len(screenshots)} of {len(urls)} URLs (last: {filename})...")
 
-                # Take screenshots (external API or tool)
-                image_paths = get_screenshots(
-                    urls,
-                    constants.SCREENSHOTMACHINE_API_KEY_LIST,
-                    output_folder=unique_folder
-                )
+        if budget is not None and budget.met(count_words(content_list), llm.total_calls()):
+            # Closing the pipeline stops the remaining captures
+            stream.close()
+            break
+
+    return screenshots, content_list
+
+def run_url_extraction(author: str, urls: list, store: ScreenshotStore, report=None,
+                       budget: ExtractionBudget = None) -> dict:
+    """Background job: capture and author content extraction for a list of URLs."""
+    llm = LLMInterface(max_calls=budget.max_calls if budget is not None else None)
+    screenshots, content_list = stream_author_content_from_urls(
+        llm=llm, author=author, urls=urls, store=store, report=report, budget=budget
+    )
+    store.gc()
+    message = None
+    if budget is not None:
+        stopped_early = budget.met(count_words(content_list), llm.total_calls())
+        message = coverage_message(len(screenshots), len(urls), stopped_early, "URL(s)")
+
+    return {
+        "content_df": build_author_content_df(author, content_list),
+        "screenshots": screenshots,
+        "failed": failed_chunks(content_list),
+        "usage": llm.usage_summary(),
+        "message": message,
+    }
+
+def extract_content_from_urls(llm):
+    st.subheader("Enter URLs (one per line)")
+    url_input = st.text_area("Paste the URLs here:", height=200, key=URL_INPUT_KEY)
+    author = st.text_area("Author/ Username (to extract what they wrote):")
+
+    budget = budget_inputs("urls")
+
+    urls = [u.strip() for u in url_input.strip().splitlines() if u.strip()]
+    if not urls:
+        return None
+
+    # Only run once per author + URL combo
+    run_key = f"url_run_{author}_{budget}_{hash(tuple(urls))}"
+    screenshot_key = f"{run_key}_screenshots"
 
-                if not image_paths:
-                    st.error("No screenshots captured.")
-                    return
+    if run_key not in st.session_state and author:
+        job_key = f"{run_key}_job"
+        if job_key not in st.session_state:
+            st.info(f"Processing {len(urls)} URLs...")
+            submit_job(job_key, run_url_extraction, author=author, urls=urls, store=get_screenshot_store(), budget=budget)
 
-                # Save to session_state to prevent reprocessing
-                st.session_state["screenshot_result"] = {
-                    "image_paths": image_paths,
-                    "zip_path": os.path.join(unique_folder, "screenshots.zip")
-                }
-                st.session_state["last_urls"] = urls
+        result = wait_for_job(job_key)
+        if result is not None:
+            if not result["screenshots"]:
+                st.error("No screenshots captured.")
+                return None
 
-                # Create ZIP file only once
-                with zipfile.ZipFile(st.session_state["screenshot_result"]["zip_path"], "w") as zipf:
-                    for image_file in image_paths:
-                        zipf.write(image_file, arcname=os.path.basename(image_file))
+            # Save to session_state to prevent reprocessing
+            st.session_state[screenshot_key] = result["screenshots"]
+            st.session_state[run_key] = result["content_df"]
 
-        # Show download button using saved result
-        image_paths = st.session_state["screenshot_result"]["image_paths"]
-        zip_path = st.session_state["screenshot_result"]["zip_path"]
+    content_df = st.session_state.get(run_key)
+    if content_df is None:
+        return None
 
-        with open(zip_path, "rb") as f:
-            zip_bytes = f.read()
+    screenshots = st.session_state[screenshot_key]
+    st.success(f"{len(screenshots)} screenshot(s) captured.")
 
-        st.success(f"{len(image_paths)} screenshot(s) captured.")
+    # Build the ZIP only when asked for, in memory
+    if st.button("Prepare screenshots ZIP"):
         st.download_button(
             label="📥 Download Screenshots",
-            data=zip_bytes,
+            data=screenshot_store.zip_bytes(screenshots),
             file_name="screenshots.zip",
             mime="application/zip"
         )
 
-# import os
-# import requests
-# import pandas as pd
-# from datetime import datetime
-
-# def run_serper_search(search_terms, SERPER_API_KEY_LIST, max_search_results=10):
-#     start = datetime.now()
-#     key_index = 0
-#     results_list = []
-
-#     headers = {
-#         "X-API-KEY": SERPER_API_KEY_LIST[key_index],
-#         "Content-Type": "application/json"
-#     }
-
-#     for term in search_terms:
-#         print(f"\nSearching for: {term}")
-        
-#         while key_index < len(SERPER_API_KEY_LIST):
-#             headers["X-API-KEY"] = SERPER_API_KEY_LIST[key_index]
-#             payload = {
-#                 "q": term,
-#                 "num": max_search_results
-#             }
-
-#             try:
-#                 response = requests.post(
-#                     "https://google.serper.dev/search", 
-#                     headers=headers, 
-#                     json=payload
-#                 )
-
-#                 if response.status_code == 429:
-#                     print(f"Key #{key_index + 1} hit its limit (429). Switching to next key...")
-#                     key_index += 1
-#                     continue
-
-#                 data = response.json()
-#                 if "error" in data:
-#                     print(f"Error: {data['error']}")
-#                     key_index += 1
-#                     continue
-
-#                 for result in data.get("organic", []):
-#                     results_list.append({
-#                         "search_term": term,
-#                         "search_result_title": result.get("title"),
-#                         "search_result_url": result.get("link"),
-#                         "search_result_content": result.get("snippet"),
-#                         "search_result_score": None,  # Serper doesn't provide a score
-#                     })
-#                 break  # Success
-
-#             except Exception as e:
-#                 print(f"Exception: {e}")
-#                 key_index += 1
-#                 continue
-
-#         if key_index >= len(SERPER_API_KEY_LIST):
-#             print("All Serper API keys exhausted.")
-#             break
-
-#     df = pd.DataFrame(results_list)
-#     display(df.sample(min(5, len(df))))
-#     end = datetime.now()
-
-#     print("Duration:", end - start)
-#     print("Final Serper API key used:", key_index + 1)
-
-#     return df
+    show_author_content(content_df)
+    show_similar_authors(content_df, run_key)
+    return content_df
@@ -0,0 +1,107 @@
+import time
+import uuid
+import threading
+
+from collections import OrderedDict, deque
+
+
+class Job:
+
+    """A unit of background work. `fn` is called with a `report(done, total, message)` keyword argument."""
+
+    def __init__(self, user: str, fn, args: tuple, kwargs: dict):
+        self.id = uuid.uuid4().hex
+        self.user = user
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.status = "queued"
+        self.progress = (0, 0, "")
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.finished_at = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def report(self, done: int, total: int, message: str = ""):
+        self.progress = (done, total, message)
+
+
+class JobQueue:
+
+    """
+    In-process job queue with a local worker pool, shared by every Streamlit session of the server.
+    Each user has their own FIFO and workers take jobs from users in round-robin order,
+    so one analyst's big upload can't starve everyone else.
+    """
+
+    def __init__(self, workers: int = 4, keep_finished: float = 3600):
+        self.keep_finished = keep_finished
+        self.cond = threading.Condition()
+        self.pending = OrderedDict()  # user -> deque of queued jobs, in round-robin order
+        self.jobs = {}
+
+        for i in range(workers):
+            threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True).start()
+
+    def submit(self, user: str, fn, *args, **kwargs) -> Job:
+        job = Job(user, fn, args, kwargs)
+        with self.cond:
+            self._prune()
+            self.jobs[job.id] = job
+            self.pending.setdefault(user, deque()).append(job)
+            self.cond.notify()
+        return job
+
+    def get(self, job_id: str):
+        return self.jobs.get(job_id)
+
+    def position(self, job: Job) -> int:
+        """Number of queued jobs that will start before `job` (0 if it is next or already running)."""
+        with self.cond:
+            if job.status != "queued":
+                return 0
+            queues = [list(q) for q in self.pending.values()]
+            ahead = 0
+            for round_ in range(max(len(q) for q in queues)):
+                for q in queues:
+                    if round_ < len(q):
+                        if q[round_] is job:
+                            return ahead
+                        ahead += 1
+            return ahead
+
+    def _next_job(self) -> Job:
+        # Take from the user at the front, then move them to the back if they have more jobs
+        user, queue = next(iter(self.pending.items()))
+        job = queue.popleft()
+        del self.pending[user]
+        if queue:
+            self.pending[user] = queue
+        return job
+
+    def _work(self):
+        while True:
+            with self.cond:
+                while not self.pending:
+                    self.cond.wait()
+                job = self._next_job()
+                job.status = "running"
+
+            try:
+                job.result = job.fn(*job.args, report=job.report, **job.kwargs)
+                job.status = "done"
+            except Exception as e:
+                print(f"Job {job.id} failed: {e}")
+                job.error = str(e)
+                job.status = "failed"
+            finally:
+                job.finished_at = time.time()
+
+    def _prune(self):
+        now = time.time()
+        for job_id in [i for i, j in self.jobs.items() if j.finished and now - j.finished_at > self.keep_finished]:
+            del self.jobs[job_id]
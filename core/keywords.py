@@ -0,0 +1,25 @@
+from core import prompts
+from core.llm_helper import LLMInterface
+
+# Keyword and site suggestion calls. No Streamlit here, so the offline evaluation (core.evaluation) can import them.
+
+def extract_keywords(llm: LLMInterface, article: str, num_keywords: int,
+                     prompt: str = prompts.keyword_extraction_prompt, route: str = "cheap"):
+    result = llm.llm_structured(
+        schema_name="keywords",
+        prompt=prompt.format(num_keywords=num_keywords),
+        user_content=article,
+        route=route,
+        accept=lambda r: len(r["keywords"]) >= num_keywords
+    )
+    return result["keywords"]
+
+def ideate_websites(llm: LLMInterface, article: str, keywords_processed: list, route: str = "full"):
+    keywords_str = ", ".join(keywords_processed)
+    result = llm.llm_structured(
+        schema_name="sites",
+        prompt=prompts.website_ideation_sys_prompt,
+        user_content=prompts.website_ideation_prompt.format(article=article, keyword_list=keywords_str),
+        route=route
+    )
+    return result["sites"]
@@ -0,0 +1,7 @@
+import threading
+
+from core import constants
+
+# Process-wide caps shared by every session and background job, to stay within the Azure and screenshot API quotas
+LLM_SLOTS = threading.BoundedSemaphore(constants.MAX_CONCURRENT_LLM_CALLS)
+SCREENSHOT_SLOTS = threading.BoundedSemaphore(constants.MAX_CONCURRENT_SCREENSHOTS)
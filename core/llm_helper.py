@@ -1,48 +1,171 @@
-import json
-import streamlit as st
+import math
+import time
 import tiktoken
 
-from openai import AzureOpenAI
+from openai import AzureOpenAI, APIStatusError, NotFoundError
 from core import constants
+from core import limits
 from core import prompts 
+from core import structured_output
+
+def make_client():
+    return AzureOpenAI(
+        azure_endpoint=constants.AZUREOPENAI_ENDPOINT,
+        api_key=constants.AZUREOPENAI_API_KEY,
+        api_version=constants.AZUREOPENAI_API_VERION,
+    )
+
+class CallBudgetExceeded(RuntimeError):
+    """Raised instead of making a call beyond the interface's `max_calls`."""
+
 
 class LLMInterface:
 
     """
     Generic interface for interacting with an LLM (e.g., OpenAI, Azure OpenAI).
     Assumes a `client` object with a `chat.completions.create` method is available.
+    With `max_calls`, calls beyond that number (since the last `reset_usage`) raise `CallBudgetExceeded`.
     """
 
-    def __init__(self):
-        self.client = AzureOpenAI(
-        azure_endpoint=constants.AZUREOPENAI_ENDPOINT,
-        api_key=constants.AZUREOPENAI_API_KEY,
-        api_version=constants.AZUREOPENAI_API_VERION,
-    )  
+    def __init__(self, max_calls: int = None):
+        self.client = make_client()
+        self.unavailable_routes = set()
+        self.max_calls = max_calls
+        self.reset_usage()
+
+    def reset_usage(self):
+        self.usage = {
+            route: {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0, "seconds": 0.0}
+            for route in constants.MODEL_ROUTES
+        }
+        self.escalations = 0
+
+    def _resolve(self, route):
+        # A route without its own deployment, or whose deployment does not exist, is served by the full model
+        if route in self.unavailable_routes or constants.MODEL_ROUTES[route] is constants.MODEL_ROUTES["full"]:
+            return "full"
+        return route
+
+    def _create(self, route="full", **kwargs):
+        """
+        Calls the chat completions API on the deployment of `route` and records token usage
+        (including cached prompt tokens) and latency for that route.
+        If a cheaper route's deployment returns an API error, the call falls back to the full model.
+        """
+        if self.max_calls is not None and self.total_calls() >= self.max_calls:
+            raise CallBudgetExceeded(f"LLM call budget of {self.max_calls} reached")
+
+        route = self._resolve(route)
+        try:
+            with limits.LLM_SLOTS:
+                start = time.perf_counter()
+                response = self.client.chat.completions.create(model=constants.MODEL_ROUTES[route]["model"], **kwargs)
+        except APIStatusError as e:
+            if route == "full":
+                raise
+            print(f"{route} route failed ({e.status_code}), using the full model instead: {e}")
+            if isinstance(e, NotFoundError):
+                self.unavailable_routes.add(route)
+            self.escalations += 1
+            return self._create(route="full", **kwargs)
+        self._record_usage(route, response, time.perf_counter() - start)
+        return response
+
+    def _record_usage(self, route, response, seconds):
+        u = self.usage[route]
+        u["seconds"] += seconds
+        u["calls"] += 1
+
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            u["prompt_tokens"] += usage.prompt_tokens or 0
+            u["completion_tokens"] += usage.completion_tokens or 0
+            details = getattr(usage, "prompt_tokens_details", None)
+            u["cached_tokens"] += (getattr(details, "cached_tokens", 0) or 0) if details else 0
+
+    def total_calls(self) -> int:
+        return sum(u["calls"] for u in self.usage.values())
+
+    def route_cost(self, route: str) -> float:
+        u = self.usage[route]
+        input_price, cached_price, output_price = constants.MODEL_ROUTES[route]["price"]
+        return (
+            (u["prompt_tokens"] - u["cached_tokens"]) * input_price
+            + u["cached_tokens"] * cached_price
+            + u["completion_tokens"] * output_price
+        ) / 1_000_000
+
+    def usage_summary(self) -> str:
+        lines = []
+        for route, u in self.usage.items():
+            if not u["calls"]:
+                continue
+            cached_pct = 100 * u["cached_tokens"] / u["prompt_tokens"] if u["prompt_tokens"] else 0
+            lines.append(
+                f"{route} ({constants.MODEL_ROUTES[route]['model']}): {u['calls']} call(s), "
+                f"{u['prompt_tokens']:,} prompt tokens ({u['cached_tokens']:,} cached, {cached_pct:.0f}%), "
+                f"{u['completion_tokens']:,} completion tokens, {u['seconds'] / u['calls']:.2f}s average latency, "
+                f"${self.route_cost(route):.4f}"
+            )
+        if self.escalations:
+            lines.append(f"{self.escalations} answer(s) escalated to the full model")
+        return "  \n".join(lines) or "No LLM calls"
 
     # def count_tokens(text: str, model: str = "gpt-4-1106-preview") -> int:
     #     encoding = tiktoken.encoding_for_model(model)
     #     return len(encoding.encode(text))
 
-    def llm_image(self, prompt, img_base64):  
-        response = self.client.chat.completions.create(
-          model=constants.AZUREOPENAI_MODEL, 
-          messages=[
-              {"role": "user", "content": [
-                    {"type": "text", "text": prompt},
-                    {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:image/png;base64,{img_base64}"
-                        }
-                    }
-                ]
-              },
-          ]
+    @staticmethod
+    def _vision_messages(prompt, img_base64, system_prompt=None):
+        """Static `system_prompt` first so the provider can cache it as a shared prefix, then the variable parts."""
+        system_messages = [{"role": "system", "content": system_prompt}] if system_prompt else []
+        return system_messages + [
+            {"role": "user", "content": [
+                  {"type": "text", "text": prompt},
+                  {
+                      "type": "image_url",
+                      "image_url": {
+                          "url": f"data:image/png;base64,{img_base64}"
+                      }
+                  }
+              ]
+            },
+        ]
+
+    def llm_image(self, prompt, img_base64, response_format=None, system_prompt=None, route="full"):  
+        kwargs = {"response_format": response_format} if response_format else {}
+        response = self._create(
+          route=route,
+          messages=self._vision_messages(prompt, img_base64, system_prompt),
+          **kwargs
         )
         
         return response.choices[0].message.content
 
+    def llm_classify(self, prompt, img_base64, choices=("yes", "no"), system_prompt=None, route="cheap"):
+        """
+        Short-answer vision call. Runs on `route` and escalates to the full model when the answer is not
+        one of `choices` or the model's confidence in its first token is below `MIN_ROUTE_CONFIDENCE`.
+        """
+        response = self._create(
+            route=route,
+            messages=self._vision_messages(prompt, img_base64, system_prompt),
+            logprobs=True,
+        )
+        choice = response.choices[0]
+        answer = (choice.message.content or "").strip().strip('".').lower()
+
+        confidence = 1.0
+        logprobs = getattr(choice, "logprobs", None)
+        if logprobs is not None and logprobs.content:
+            confidence = math.exp(logprobs.content[0].logprob)
+
+        if self._resolve(route) != "full" and (answer not in choices or confidence < constants.MIN_ROUTE_CONFIDENCE):
+            self.escalations += 1
+            return self.llm_classify(prompt, img_base64, choices=choices, system_prompt=system_prompt, route="full")
+
+        return answer
+
     def llm_text(
             self, 
             system_prompt: str,
@@ -52,10 +175,11 @@ class LLMInterface:
             top_p: float = 0.95,
             frequency_penalty: float = 0,
             presence_penalty: float = 0,
-            stop=None
+            stop=None,
+            route: str = "full"
         ):  
-        response = self.client.chat.completions.create(
-          model=constants.AZUREOPENAI_MODEL,
+        response = self._create(
+          route=route,
           messages=[
               {"role": "system", "content": system_prompt},
               {"role": "user", "content": user_content},
@@ -71,16 +195,61 @@ class LLMInterface:
         
         return response.choices[0].message.content
     
+    def llm_structured(self, schema_name: str, prompt: str, user_content: str = None,
+                       img_base64: str = None, system_prompt: str = None, max_retries: int = 1,
+                       route: str = "full", accept=None):
+        """
+        Calls the model with a JSON-schema `response_format` and returns the validated dict.
+        `prompt` is the system prompt of a text call with `user_content`, or the prompt of a vision call with `img_base64`
+        (which is sent after the static `system_prompt`).
+        Markdown fences are stripped locally. On a cheaper `route`, a malformed answer or one rejected by
+        `accept(result)` is escalated to the full model; on the full model the call is repeated at most
+        `max_retries` times, after which `StructuredOutputError` is raised.
+        Only a response cut off at the token limit is repaired (a retry would be cut off again): its last,
+        possibly half-written item is dropped and the result carries an "error" so it is reported and not cached.
+        """
+        route = self._resolve(route)
+        fmt = structured_output.response_format(schema_name)
+        if img_base64 is not None:
+            request = {"messages": self._vision_messages(prompt, img_base64, system_prompt)}
+        else:
+            request = {
+                "messages": [
+                    {"role": "system", "content": prompt},
+                    {"role": "user", "content": user_content},
+                ],
+                "temperature": 0,
+                "top_p": 0.95,
+                "frequency_penalty": 0,
+                "presence_penalty": 0,
+                "stop": None,
+            }
+
+        attempts = 1 if route != "full" else max_retries + 1
+        for attempt in range(attempts):
+            choice = self._create(route=route, response_format=fmt, **request).choices[0]
+            truncated = choice.finish_reason == "length"
+            try:
+                result = structured_output.parse(choice.message.content, schema_name, truncated=truncated)
+            except structured_output.StructuredOutputError as e:
+                error = e
+                print(f"Malformed {schema_name} response on {route} route (attempt {attempt + 1}): {e}")
+                continue
+            if truncated:
+                print(f"Truncated {schema_name} response on {route} route")
+                return structured_output.drop_truncated(result, schema_name)
+            if self._resolve(route) == "full" or accept is None or accept(result):
+                return result
+            error = structured_output.StructuredOutputError(f"{schema_name} response rejected on {route} route")
+
+        if self._resolve(route) != "full":
+            self.escalations += 1
+            return self.llm_structured(
+                schema_name, prompt, user_content=user_content, img_base64=img_base64,
+                system_prompt=system_prompt, max_retries=max_retries, route="full"
+            )
+        raise error
+
     def post_process_llm_response(self, processing_prompt: str, response_content: str):
-        
-      try:
-        #   response_content = self.llm_text(
-        #         system_prompt=processing_prompt,
-        #         user_content=response_content
-        #     )
-          cleaned_response = json.loads(response_content)
-          return cleaned_response
-      except json.JSONDecodeError:
-          cleaned = re.sub(r"^```(?:json)?\n|```$", "", response_content.strip(), flags=re.MULTILINE)
-          cleaned_response = json.loads(cleaned)
-          return cleaned_response
+        """Parses a JSON response locally (no extra LLM call); `processing_prompt` is kept for compatibility."""
+        return structured_output.parse_json(response_content)
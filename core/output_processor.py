@@ -1,7 +1,4 @@
-import json
-import re
-
-from core.llm import client, llm_text
+from core import structured_output
 
 process_into_dict_sys_prompt = '''
 You will be given a string that represents a dictionary of key-value pairs. 
@@ -54,13 +51,9 @@ Input string:
 {{input_string}}
 '''
 
-def process_output(output, process_prompt):
-    
-    question = process_prompt + output
-    try:
-        json_output = json.loads(output)
-        return json_output
-    except json.JSONDecodeError:
-        cleaned = re.sub(r"^```(?:json)?\n|```$", "", llm_text(client, question).strip(), flags=re.MULTILINE)
-        json_output = json.loads(cleaned)
-        return json_output
\ No newline at end of file
+def process_output(output, process_prompt=None):
+    """
+    Parses an LLM output into JSON locally, repairing fences and truncation without a second LLM call.
+    `process_prompt` is kept for compatibility.
+    """
+    return structured_output.parse_json(output)
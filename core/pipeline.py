@@ -0,0 +1,81 @@
+import queue
+import threading
+
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, error):
+        self.error = error
+
+
+def run_pipeline(source, stages, maxsize=4):
+    """
+    Runs `source` and each function in `stages` in its own thread, connected by bounded queues.
+    Yields the output of the last stage as soon as each item gets through, so total latency
+    approaches the slowest stage instead of the sum of all stages.
+
+    Worker threads must not call Streamlit: only the consuming (script) thread can render.
+    An exception in any stage is re-raised in the consumer. Closing the generator early
+    signals the workers to stop.
+    """
+    stop = threading.Event()
+    queues = [queue.Queue(maxsize=maxsize) for _ in range(len(stages) + 1)]
+
+    def _put(q, item):
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(q):
+        while not stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _produce():
+        try:
+            for item in source:
+                if not _put(queues[0], item):
+                    return
+        except Exception as e:
+            _put(queues[0], _Failure(e))
+            return
+        _put(queues[0], _DONE)
+
+    def _stage(fn, in_q, out_q):
+        while True:
+            item = _get(in_q)
+            if item is _DONE or isinstance(item, _Failure):
+                _put(out_q, item)
+                return
+            try:
+                result = fn(item)
+            except Exception as e:
+                _put(out_q, _Failure(e))
+                return
+            if not _put(out_q, result):
+                return
+
+    threads = [threading.Thread(target=_produce, daemon=True)]
+    for i, fn in enumerate(stages):
+        threads.append(threading.Thread(target=_stage, args=(fn, queues[i], queues[i + 1]), daemon=True))
+    for t in threads:
+        t.start()
+
+    try:
+        while True:
+            item = queues[-1].get()
+            if item is _DONE:
+                break
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
@@ -90,59 +90,64 @@ KEYWORDS:
 {keyword_list}
 '''
 
-author_checker_prompt = '''
+# Vision tasks: one static system prompt per task, identical for every call of that task,
+# and a short user message with only the target author (plus the screenshot)
+author_checker_system_prompt = '''
 You are an assistant helping verify whether a person authored any content in a screenshot.
-
-Target author: "{author}"
+The target author is given with the screenshot.
 
 Follow these steps:
 
 1. Read the image text carefully.
-2. Check if "{author}" appears **exactly** as the author of any content — such as:
+2. Check if the target author appears **exactly** as the author of any content — such as:
    - A visible username or handle next to a post
    - A byline, reply tag, or attribution explicitly showing authorship
 
-3. Do **not** guess or infer based on similar names. Only confirm if it **exactly matches** "{author}".
+3. Do **not** guess or infer based on similar names. Only confirm if it **exactly matches** the target author.
 
 Return only:
-- "yes" — if "{author}" is clearly shown as an author
+- "yes" — if the target author is clearly shown as an author
 - "no" — if not
 
 No extra explanation.
 '''
 
-
-
-author_content_extraction_prompt = '''
+author_content_extraction_system_prompt = '''
 You are a data extraction assistant helping an OSINT analyst identify and structure content written by a specific individual from a screenshot containing text.
+The target author is given with the screenshot.
 
-Your goal is to extract only the content explicitly authored by the person named "{author}". The text may come from forums, blogs, social media, comment sections, or other platforms.
+Your goal is to extract only the content explicitly authored by the target author. The text may come from forums, blogs, social media, comment sections, or other platforms.
 
 Follow these steps carefully:
 
-1. **Check if the name "{author}" appears anywhere in the text** — as a username, handle, author tag, or attribution label. Do not infer or assume — only proceed if there is clear textual evidence of this name.
+1. **Check if the target author's name appears anywhere in the text** — as a username, handle, author tag, or attribution label. Do not infer or assume — only proceed if there is clear textual evidence of this name.
 
-2. If "{author}" is found, identify all the text **directly attributed** to them. This may include:
-   - Posts or comments where "{author}" is clearly shown as the author
-   - Replies or messages labeled as coming from "{author}"
+2. If the target author is found, identify all the text **directly attributed** to them. This may include:
+   - Posts or comments where the target author is clearly shown as the author
+   - Replies or messages labeled as coming from the target author
 
 3. Extract only their content, **excluding anything written by others**.
 
-4. If no content from "{author}" is found, return an **empty list**.
+4. If no content from the target author is found, return an **empty list**.
 
 Always return your output as a **valid JSON object** in this exact format:
 
 **If content is found:**
-{{
+{
   "content": [
-    "First piece of content written by {author}.",
-    "Second piece of content written by {author}."
+    "First piece of content written by the target author.",
+    "Second piece of content written by the target author."
   ]
-}}
+}
 
 **If no content is found:**
-{{
+{
   "content": []
-}}
+}
 '''
 
+author_checker_prompt = '''Target author: "{author}"
+'''
+
+author_content_extraction_prompt = '''Target author: "{author}"
+'''
@@ -0,0 +1,132 @@
+import os
+import io
+import json
+import time
+import shutil
+import hashlib
+import zipfile
+import threading
+
+
+class ScreenshotStore:
+
+    """
+    URL-keyed, content-addressed store of captured screenshots shared by all sessions.
+    Blobs are saved once per content hash under `blobs/`, and `index.json` maps each URL to its blob,
+    display filename, capture time and last use. Entries older than `ttl` seconds are recaptured,
+    and `gc` evicts expired entries, then least recently used ones until the store fits in `max_bytes`.
+    Blobs handed out in the last `grace` seconds are never evicted, as a running job may not have read them yet.
+    """
+
+    def __init__(self, folder: str, ttl: float, max_bytes: int, grace: float = 15 * 60):
+        self.folder = folder
+        self.blob_folder = os.path.join(folder, "blobs")
+        self.index_path = os.path.join(folder, "index.json")
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.grace = grace
+        self.lock = threading.Lock()
+        os.makedirs(self.blob_folder, exist_ok=True)
+
+        self.index = {}
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, "r", encoding="utf-8") as f:
+                    self.index = json.load(f)
+            except ValueError:
+                print("Screenshot index is corrupt; starting a new one.")
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.blob_folder, f"{digest}.png")
+
+    def _save_index(self):
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.index, f)
+        os.replace(tmp_path, self.index_path)
+
+    def get(self, url: str):
+        """Returns (filename, path) of a fresh capture of `url`, or None if it must be (re)captured."""
+        with self.lock:
+            entry = self.index.get(url)
+            if entry is None or time.time() - entry["captured_at"] > self.ttl:
+                return None
+            path = self._blob_path(entry["hash"])
+            if not os.path.exists(path):
+                return None
+            entry["last_used"] = time.time()
+            self._save_index()
+            return entry["filename"], path
+
+    def put(self, url: str, filename: str, content: bytes):
+        """Stores a capture of `url` and returns (filename, path). Identical images share one blob."""
+        digest = hashlib.sha256(content).hexdigest()
+        path = self._blob_path(digest)
+        with self.lock:
+            if not os.path.exists(path):
+                tmp_path = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(content)
+                os.replace(tmp_path, path)
+            now = time.time()
+            self.index[url] = {"hash": digest, "filename": filename, "captured_at": now, "last_used": now}
+            self._save_index()
+        return filename, path
+
+    def gc(self):
+        """
+        Drops expired entries, then evicts least recently used blobs until under `max_bytes`.
+        Entries used within `grace` seconds are kept even if expired or over the size limit.
+        """
+        with self.lock:
+            now = time.time()
+            expired = [
+                u for u, e in self.index.items()
+                if now - e["captured_at"] > self.ttl and now - e["last_used"] > self.grace
+            ]
+            for url in expired:
+                del self.index[url]
+
+            # A blob may back several URLs; it is used as recently as its most recent URL
+            last_used = {}
+            for entry in self.index.values():
+                last_used[entry["hash"]] = max(last_used.get(entry["hash"], 0), entry["last_used"])
+
+            sizes = {}
+            for name in os.listdir(self.blob_folder):
+                digest, ext = os.path.splitext(name)
+                path = os.path.join(self.blob_folder, name)
+                if ext != ".png" or digest not in last_used:
+                    # Orphaned blob (expired, or left over from an interrupted write)
+                    os.remove(path)
+                    continue
+                sizes[digest] = os.path.getsize(path)
+
+            total = sum(sizes.values())
+            evicted = set()
+            for digest in sorted(sizes, key=lambda d: last_used[d]):
+                if total <= self.max_bytes or now - last_used[digest] <= self.grace:
+                    # Sorted by last use, so every remaining blob is in use too
+                    break
+                os.remove(self._blob_path(digest))
+                total -= sizes[digest]
+                evicted.add(digest)
+
+            self.index = {u: e for u, e in self.index.items() if e["hash"] not in evicted}
+            self._save_index()
+            return total
+
+
+def zip_bytes(files) -> bytes:
+    """
+    Builds a ZIP of (arcname, path) pairs in memory on demand, streaming each file in, so no second copy
+    is written to disk. PNGs are already compressed, so they are stored as-is.
+    """
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_STORED) as zipf:
+        for arcname, path in files:
+            if not os.path.exists(path):
+                continue  # Evicted since capture
+            with open(path, "rb") as src, zipf.open(arcname, "w") as dst:
+                shutil.copyfileobj(src, dst)
+    return buffer.getvalue()
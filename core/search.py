@@ -0,0 +1,188 @@
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+import requests
+import pandas as pd
+
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse, urlunparse
+
+
+class KeysExhaustedError(RuntimeError):
+    """Raised when every API key has run out of quota."""
+
+
+class KeyRotator:
+
+    """Thread-safe rotation through a list of API keys, moving on when one runs out of quota."""
+
+    def __init__(self, keys):
+        self.keys = list(keys)
+        self.index = 0
+        self.lock = threading.Lock()
+
+    def current(self):
+        with self.lock:
+            if self.index >= len(self.keys):
+                raise KeysExhaustedError("All search API keys exhausted.")
+            return self.keys[self.index]
+
+    def exhausted(self, key):
+        with self.lock:
+            # Several threads may report the same key; only advance once
+            if self.index < len(self.keys) and self.keys[self.index] == key:
+                print(f"Key #{self.index + 1} hit its limit. Switching to next key...")
+                self.index += 1
+
+
+# serper.dev answers 400/403 both for bad requests and for keys that have run out of credits
+OUT_OF_CREDITS_PATTERN = re.compile(r"(?i)credit|quota")
+
+
+class SerperBackend:
+
+    """Google results through serper.dev, rotating keys on quota errors."""
+
+    url = "https://google.serper.dev/search"
+
+    def __init__(self, api_keys):
+        self.keys = KeyRotator(api_keys)
+
+    def search(self, query: str, num: int = 10) -> list:
+        while True:
+            key = self.keys.current()
+            response = requests.post(
+                self.url,
+                headers={"X-API-KEY": key, "Content-Type": "application/json"},
+                json={"q": query, "num": num},
+                timeout=30,
+            )
+            # 429: rate/quota limit; 400/403 only when the key is out of credits, not for a malformed query
+            if response.status_code == 429 or (
+                response.status_code in [400, 403] and OUT_OF_CREDITS_PATTERN.search(response.text)
+            ):
+                self.keys.exhausted(key)
+                continue
+            response.raise_for_status()
+
+            return [
+                {"title": r.get("title"), "url": r.get("link"), "snippet": r.get("snippet")}
+                for r in response.json().get("organic", [])
+            ]
+
+
+class StubBackend:
+
+    """Offline backend returning deterministic fake results, for tests and demos."""
+
+    def __init__(self, results_per_query: int = 3):
+        self.results_per_query = results_per_query
+        self.queries = []
+
+    def search(self, query: str, num: int = 10) -> list:
+        self.queries.append(query)
+        slug = hashlib.sha1(query.encode("utf-8")).hexdigest()[:8]
+        return [
+            {"title": f"Result {i} for {query}", "url": f"https://example.com/{slug}/{i}", "snippet": query}
+            for i in range(min(num, self.results_per_query))
+        ]
+
+
+class SearchCache:
+
+    """On-disk cache of search results per (query, num), expiring after `ttl` seconds."""
+
+    def __init__(self, folder: str = None, ttl: float = 24 * 3600):
+        self.folder = folder or os.path.join(os.getcwd(), ".streamlit_cache", "search")
+        self.ttl = ttl
+        os.makedirs(self.folder, exist_ok=True)
+
+    def _path(self, query: str, num: int) -> str:
+        digest = hashlib.sha256(f"{num}:{query}".encode("utf-8")).hexdigest()
+        return os.path.join(self.folder, f"{digest}.json")
+
+    def get(self, query: str, num: int):
+        path = self._path(query, num)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def set(self, query: str, num: int, results: list):
+        path = self._path(query, num)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+
+def build_queries(keywords: list, sites: list) -> list:
+    """Keyword x site query matrix, e.g. '"steady bojio" site:reddit.com'. Keywords alone if there are no sites."""
+    queries = []
+    for keyword in keywords:
+        for site in sites or [""]:
+            site = site.strip()
+            if site and not site.startswith("site:"):
+                site = f"site:{site}"
+            queries.append(f'"{keyword}" {site}'.strip())
+    return queries
+
+def normalize_url(url: str) -> str:
+    parsed = urlparse(url.strip())
+    return urlunparse((parsed.scheme.lower(), parsed.netloc.lower(), parsed.path.rstrip("/"), "", parsed.query, ""))
+
+def run_search(queries: list, backend, cache: SearchCache = None, num: int = 10, max_workers: int = 8):
+    """
+    Runs all queries concurrently through `backend`, using `cache` where fresh results exist.
+    Returns one row per unique URL, ranked by how many queries found it and then by best position,
+    and a dict of query -> error message for the queries that failed (e.g. once every key is exhausted),
+    so the results of the other queries are kept.
+    """
+    def _search(query):
+        if cache is not None:
+            cached = cache.get(query, num)
+            if cached is not None:
+                return cached, None
+        try:
+            results = backend.search(query, num=num)
+        except Exception as e:
+            print(f"Search failed for {query}: {e}")
+            return [], str(e)
+        if cache is not None:
+            cache.set(query, num, results)
+        return results, None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        outcomes = list(executor.map(_search, queries))
+
+    all_results = [results for results, _ in outcomes]
+    errors = {query: error for query, (_, error) in zip(queries, outcomes) if error is not None}
+
+    rows = {}
+    for query, results in zip(queries, all_results):
+        for position, result in enumerate(results):
+            if not result.get("url"):
+                continue
+            key = normalize_url(result["url"])
+            if key not in rows:
+                rows[key] = {
+                    "search_result_url": result["url"],
+                    "search_result_title": result.get("title"),
+                    "search_result_content": result.get("snippet"),
+                    "search_terms": [],
+                    "best_position": position,
+                }
+            rows[key]["search_terms"].append(query)
+            rows[key]["best_position"] = min(rows[key]["best_position"], position)
+
+    df = pd.DataFrame(list(rows.values()), columns=[
+        "search_result_url", "search_result_title", "search_result_content", "search_terms", "best_position"
+    ])
+    df["hits"] = df["search_terms"].str.len()
+    return df.sort_values(["hits", "best_position"], ascending=[False, True]).reset_index(drop=True), errors
@@ -0,0 +1,176 @@
+import re
+import json
+
+# Bounded repair policy: how many truncation points to try when salvaging a partial response
+MAX_REPAIR_CANDIDATES = 32
+
+_FENCE_PATTERN = re.compile(r"^```(?:json)?\s*|\s*```\s*$", re.MULTILINE)
+
+
+class StructuredOutputError(ValueError):
+    """Raised when a response cannot be parsed or does not match its schema."""
+
+
+def _string_list_schema(key: str) -> dict:
+    return {
+        "type": "object",
+        "properties": {key: {"type": "array", "items": {"type": "string"}}},
+        "required": [key],
+        "additionalProperties": False,
+    }
+
+SCHEMAS = {
+    "keywords": _string_list_schema("keywords"),
+    "sites": _string_list_schema("sites"),
+    "author_content": _string_list_schema("content"),
+}
+
+def response_format(schema_name: str) -> dict:
+    """JSON-schema `response_format` so the model is constrained to valid output up front."""
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": schema_name, "strict": True, "schema": SCHEMAS[schema_name]},
+    }
+
+
+def _close(text: str, stack) -> str:
+    return text + "".join("]" if c == "[" else "}" for c in reversed(stack))
+
+def _loads_partial(text: str):
+    """
+    Parses `text`, completing it if it was cut off: closes an open string and open brackets,
+    and if that is not enough, backs off to the last complete element.
+    """
+    try:
+        return json.JSONDecoder().raw_decode(text)[0]
+    except ValueError:
+        pass
+
+    stack = []
+    in_string = False
+    escape = False
+    cuts = []  # (position, open brackets at that position) where the document can be cut cleanly
+
+    for i, ch in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+            continue
+
+        if ch == '"':
+            in_string = True
+        elif ch in "[{":
+            stack.append(ch)
+            cuts.append((i + 1, tuple(stack)))
+        elif ch in "]}":
+            if stack:
+                stack.pop()
+            cuts.append((i + 1, tuple(stack)))
+        elif ch == ",":
+            cuts.append((i, tuple(stack)))
+
+    tail = text
+    if in_string:
+        tail = (text[:-1] if escape else text) + '"'
+    candidates = [_close(tail.rstrip().rstrip(","), stack)]
+    for pos, open_brackets in reversed(cuts[-MAX_REPAIR_CANDIDATES:]):
+        candidates.append(_close(text[:pos].rstrip().rstrip(","), open_brackets))
+
+    for candidate in candidates:
+        try:
+            return json.loads(candidate)
+        except ValueError:
+            continue
+
+    raise StructuredOutputError(f"Could not parse JSON from response: {text[:200]!r}")
+
+
+class StreamingJSONParser:
+
+    """
+    Tolerant parser for a JSON document that is still arriving or was cut off.
+    Markdown fences and any text before the first bracket are ignored.
+    `value(complete=True)` parses a finished document strictly: only an incomplete one is repaired,
+    so a malformed response raises rather than being cut back to whatever still parses.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+
+    def feed(self, chunk: str):
+        """Adds a chunk and returns the best parse of everything received so far (None if nothing yet)."""
+        self.buffer += chunk or ""
+        try:
+            return self.value()
+        except StructuredOutputError:
+            return None
+
+    def value(self, complete: bool = False):
+        text = _FENCE_PATTERN.sub("", self.buffer.strip())
+        starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+        if not starts:
+            raise StructuredOutputError(f"No JSON found in response: {self.buffer[:200]!r}")
+        text = text[min(starts):]
+
+        if not complete:
+            return _loads_partial(text)
+        try:
+            return json.JSONDecoder().raw_decode(text)[0]
+        except ValueError as e:
+            raise StructuredOutputError(f"Malformed JSON in response ({e}): {text[:200]!r}")
+
+def parse_json(text: str, truncated: bool = False):
+    """Parses a finished response; it is only repaired if `truncated` (cut off at the token limit)."""
+    parser = StreamingJSONParser()
+    parser.buffer = text or ""
+    return parser.value(complete=not truncated)
+
+
+def validate(value, schema: dict, path: str = "$"):
+    """Minimal JSON-schema check for the object/array/string shapes used in `SCHEMAS`."""
+    expected = schema.get("type")
+
+    if expected == "object":
+        if not isinstance(value, dict):
+            raise StructuredOutputError(f"{path}: expected object, got {type(value).__name__}")
+        for key in schema.get("required", []):
+            if key not in value:
+                raise StructuredOutputError(f"{path}: missing required key '{key}'")
+        for key, sub_schema in schema.get("properties", {}).items():
+            if key in value:
+                validate(value[key], sub_schema, f"{path}.{key}")
+    elif expected == "array":
+        if not isinstance(value, list):
+            raise StructuredOutputError(f"{path}: expected array, got {type(value).__name__}")
+        for i, item in enumerate(value):
+            validate(item, schema.get("items", {}), f"{path}[{i}]")
+    elif expected == "string":
+        if not isinstance(value, str):
+            raise StructuredOutputError(f"{path}: expected string, got {type(value).__name__}")
+
+def parse(text: str, schema_name: str, truncated: bool = False) -> dict:
+    """Parses a response (repairing it only if `truncated`) and validates it against `SCHEMAS[schema_name]`."""
+    schema = SCHEMAS[schema_name]
+    value = parse_json(text, truncated=truncated)
+
+    # A bare list is accepted for single-list schemas, e.g. ["a", "b"] for {"keywords": [...]}
+    if isinstance(value, list) and len(schema["required"]) == 1:
+        value = {schema["required"][0]: value}
+
+    validate(value, schema)
+    return value
+
+def drop_truncated(value: dict, schema_name: str) -> dict:
+    """
+    For a response cut off at the token limit: drops the last item of each list, which may be
+    half-written even though the repaired document parses, and records the truncation as an "error".
+    """
+    value = dict(value)
+    for key in SCHEMAS[schema_name]["required"]:
+        value[key] = value[key][:-1]
+    value["error"] = f"{schema_name} response was cut off at the token limit; the last item was dropped"
+    return value
@@ -0,0 +1,79 @@
+import json
+import os
+
+from types import SimpleNamespace
+from core import evaluation
+
+SAMPLE_DIR = os.path.join(os.path.dirname(__file__), "..", "eval")
+
+
+def _load(name):
+    with open(os.path.join(SAMPLE_DIR, name), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class FakeClient:
+
+    """Answers keyword calls with words taken from the article and site calls with a fixed list."""
+
+    def __init__(self):
+        self.calls = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, messages, response_format, **kwargs):
+        self.calls.append((model, response_format["json_schema"]["name"]))
+        if response_format["json_schema"]["name"] == "keywords":
+            words = messages[1]["content"].split()
+            content = json.dumps({"keywords": [w.strip(".,!") for w in words[:10]]})
+        else:
+            content = json.dumps({"sites": ["forums.hardwarezone.com.sg", "reddit.com"]})
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content), finish_reason="stop", logprobs=None)],
+            usage=SimpleNamespace(prompt_tokens=100, completion_tokens=20, prompt_tokens_details=None),
+        )
+
+
+def test_record_then_replay_sample(tmp_path, monkeypatch):
+    dataset = _load("sample_dataset.json")
+    configs = _load("sample_configs.json")
+
+    client = FakeClient()
+    monkeypatch.setattr(evaluation, "make_client", lambda: client)
+    recorded, recorded_summary = evaluation.run_evaluation(
+        dataset, configs, evaluation.ResponseCache(str(tmp_path), "record"), max_workers=4
+    )
+    assert client.calls
+    assert recorded["error"].isna().all()
+
+    def no_client():
+        raise AssertionError("replay must not create an API client")
+    monkeypatch.setattr(evaluation, "make_client", no_client)
+    replayed, replayed_summary = evaluation.run_evaluation(
+        dataset, configs, evaluation.ResponseCache(str(tmp_path), "replay"), max_workers=4
+    )
+
+    # Replayed latency is the recorded one, which is measured slightly differently from the live run
+    columns = ["keyword_precision", "held_out_recall", "site_precision", "site_recall", "tokens", "cost", "errors"]
+    assert replayed_summary[columns].equals(recorded_summary[columns])
+    assert set(replayed_summary.index) == {c["name"] for c in configs}
+    assert (replayed["calls"] == 2).all()
+
+
+def test_site_calls_follow_the_config_route(tmp_path, monkeypatch):
+    client = FakeClient()
+    monkeypatch.setattr(evaluation, "make_client", lambda: client)
+    monkeypatch.setitem(evaluation.constants.MODEL_ROUTES, "cheap", {"model": "mini", "price": (0, 0, 0)})
+
+    dataset = _load("sample_dataset.json")[:1]
+    evaluation.run_evaluation(dataset, [{"name": "cheap", "route": "cheap"}],
+                              evaluation.ResponseCache(str(tmp_path), "record"))
+    assert client.calls == [("mini", "keywords"), ("mini", "sites")]
+
+
+def test_score_keywords_counts_only_unique_hits():
+    scores = evaluation.score_keywords(
+        ["steady bojio", "kopi", "lah"],
+        held_out=["Steady bojio again", "kopi time"],
+        other_posts=["kopi with friends"],
+    )
+    assert scores == {"keyword_precision": 1 / 3, "held_out_recall": 0.5}
@@ -0,0 +1,123 @@
+import os
+import time
+
+from types import SimpleNamespace
+from core import search
+
+
+class FixedBackend:
+
+    """Returns canned results per query; raises for queries mapped to an exception."""
+
+    def __init__(self, results):
+        self.results = results
+
+    def search(self, query, num=10):
+        result = self.results[query]
+        if isinstance(result, Exception):
+            raise result
+        return result[:num]
+
+
+def _result(url):
+    return {"title": url, "url": url, "snippet": ""}
+
+
+def test_build_queries():
+    queries = search.build_queries(["steady bojio", "sian"], ["reddit.com", "site:forums.hardwarezone.com.sg", " "])
+    assert queries == [
+        '"steady bojio" site:reddit.com',
+        '"steady bojio" site:forums.hardwarezone.com.sg',
+        '"steady bojio"',
+        '"sian" site:reddit.com',
+        '"sian" site:forums.hardwarezone.com.sg',
+        '"sian"',
+    ]
+    assert search.build_queries(["sian"], []) == ['"sian"']
+
+
+def test_run_search_dedupes_and_ranks():
+    backend = FixedBackend({
+        "a": [_result("https://Example.com/post/1/"), _result("https://example.com/post/2")],
+        "b": [_result("https://example.com/post/3"), _result("https://example.com/post/1")],
+        "c": [_result("https://example.com/post/2"), _result("https://example.com/post/1?page=2")],
+    })
+    df, errors = search.run_search(["a", "b", "c"], backend)
+
+    assert errors == {}
+    # post/1 and post/2 were each found by two queries; query strings are kept, case and trailing slashes are not
+    assert list(df["search_result_url"]) == [
+        "https://Example.com/post/1/",
+        "https://example.com/post/2",
+        "https://example.com/post/3",
+        "https://example.com/post/1?page=2",
+    ]
+    assert list(df["hits"]) == [2, 2, 1, 1]
+    assert list(df["best_position"]) == [0, 0, 0, 1]
+    assert df.loc[0, "search_terms"] == ["a", "b"]
+
+
+def test_run_search_keeps_partial_results_when_a_query_fails():
+    backend = FixedBackend({
+        "ok": [_result("https://example.com/1")],
+        "dead": search.KeysExhaustedError("All search API keys exhausted."),
+    })
+    df, errors = search.run_search(["ok", "dead"], backend)
+
+    assert list(df["search_result_url"]) == ["https://example.com/1"]
+    assert errors == {"dead": "All search API keys exhausted."}
+
+
+def test_search_cache_ttl(tmp_path):
+    backend = search.StubBackend(results_per_query=2)
+    cache = search.SearchCache(folder=str(tmp_path), ttl=60)
+
+    first, _ = search.run_search(["a", "b"], backend, cache=cache)
+    second, _ = search.run_search(["a", "b"], backend, cache=cache)
+    assert sorted(backend.queries) == ["a", "b"]
+    assert first.equals(second)
+
+    # Age one entry past the TTL: only that query goes back to the backend
+    path = cache._path("a", 10)
+    old = time.time() - 120
+    os.utime(path, (old, old))
+    search.run_search(["a", "b"], backend, cache=cache)
+    assert sorted(backend.queries) == ["a", "a", "b"]
+
+
+def test_failed_queries_are_not_cached(tmp_path):
+    cache = search.SearchCache(folder=str(tmp_path))
+    search.run_search(["q"], FixedBackend({"q": RuntimeError("boom")}), cache=cache)
+    assert cache.get("q", 10) is None
+
+
+def test_serper_rotates_only_on_quota_errors(monkeypatch):
+    responses = {
+        "bad-query-key": SimpleNamespace(status_code=400, text='{"message": "Query not allowed"}'),
+        "rate-limited": SimpleNamespace(status_code=429, text=""),
+        "no-credits": SimpleNamespace(status_code=400, text='{"message": "Not enough credits"}'),
+    }
+    calls = []
+
+    def post(url, headers, json, timeout):
+        calls.append(headers["X-API-KEY"])
+        response = responses[headers["X-API-KEY"]]
+
+        def raise_for_status():
+            raise RuntimeError(f"HTTP {response.status_code}")
+        return SimpleNamespace(**vars(response), raise_for_status=raise_for_status)
+
+    monkeypatch.setattr(search.requests, "post", post)
+
+    # A malformed query fails on its own without burning the key
+    backend = search.SerperBackend(["bad-query-key", "rate-limited"])
+    df, errors = search.run_search(["q"], backend)
+    assert calls == ["bad-query-key"] and backend.keys.index == 0
+    assert list(errors) == ["q"] and df.empty
+
+    # Quota errors move on to the next key until none are left
+    calls.clear()
+    backend = search.SerperBackend(["rate-limited", "no-credits"])
+    _, errors = search.run_search(["q"], backend)
+    assert calls == ["rate-limited", "no-credits"]
+    assert errors == {"q": "All search API keys exhausted."}
@@ -0,0 +1,58 @@
+import pytest
+
+from core import structured_output
+from core.structured_output import StructuredOutputError, StreamingJSONParser
+
+
+def test_fenced_response():
+    text = '```json\n{"keywords": ["steady bojio", "sian"]}\n```'
+    assert structured_output.parse(text, "keywords") == {"keywords": ["steady bojio", "sian"]}
+
+
+def test_text_before_json_is_ignored():
+    assert structured_output.parse_json('Here you go: {"sites": ["reddit.com"]}') == {"sites": ["reddit.com"]}
+
+
+def test_bare_list_is_wrapped():
+    assert structured_output.parse('["a", "b"]', "sites") == {"sites": ["a", "b"]}
+
+
+@pytest.mark.parametrize("text", [
+    '{"content": ["a" "b"]}',
+    '{"content": ["first post", "second post" "third"]}',
+    '{"content": ["cut off',
+    "no json at all",
+])
+def test_malformed_complete_response_raises(text):
+    with pytest.raises(StructuredOutputError):
+        structured_output.parse(text, "author_content")
+
+
+def test_schema_mismatch_raises():
+    with pytest.raises(StructuredOutputError):
+        structured_output.parse('{"content": [1, 2]}', "author_content")
+    with pytest.raises(StructuredOutputError):
+        structured_output.parse('{"posts": []}', "author_content")
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"content": ["first post", "second po', ["first post", "second po"]),
+    ('{"content": ["first post", ', ["first post"]),
+    ('```json\n{"content": ["first post"', ["first post"]),
+])
+def test_truncated_response_is_repaired(text, expected):
+    assert structured_output.parse(text, "author_content", truncated=True) == {"content": expected}
+
+
+def test_drop_truncated_marks_the_result():
+    result = structured_output.drop_truncated({"content": ["first post", "second po"]}, "author_content")
+    assert result["content"] == ["first post"]
+    assert "error" in result
+
+
+def test_streaming_parser_returns_best_parse_so_far():
+    parser = StreamingJSONParser()
+    assert parser.feed("") is None
+    assert parser.feed('{"keywords": ["a", "b') == {"keywords": ["a", "b"]}
+    assert parser.feed('c"]}') == {"keywords": ["a", "bc"]}
+    assert parser.value(complete=True) == {"keywords": ["a", "bc"]}